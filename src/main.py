@@ -1,7 +1,17 @@
 from view.ui import MainWindow
 from PyQt5.QtWidgets import QApplication
 from utils.utils import load_json_from_file
-import sys,os
+from utils.metrics import start_metrics_server
+from utils.fleet_analytics import export_fleet_analytics
+from utils.snapshot_store import SnapshotStore
+from utils.profiling import enable_profiling, DEFAULT_PROFILE_DIR
+from utils.webhooks import RepoUpdateQueue, WebhookReceiver, start_webhook_server, replay_events, DEFAULT_WEBHOOK_PORT, WEBHOOK_PATH
+from models.RepositoryDataFetcher import RepositoryFetcher
+from utils.generate_data import HEADERS
+from utils.sharding import generate_shard, merge_shards, parse_shard_spec
+from models.RepoDataset import RepoDataset
+from datetime import date, datetime
+import sys,os,argparse,json,threading
 from dotenv import load_dotenv
 from json import JSONDecodeError
 
@@ -31,6 +41,7 @@ def initial_data_load_handler():
 
 def run_main_window():
     data = initial_data_load_handler()         
+    start_metrics_server()
 
     # Initialize the application
     app = QApplication(sys.argv)
@@ -44,5 +55,76 @@ def run_main_window():
     # Execute the application's event loop
     sys.exit(app.exec_())
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="View and analyse generated repository stats.")
+    parser.add_argument("--export-analytics", metavar="PATH",
+                        help="Write fleet-wide language analytics for DATA_SAVE_PATH to a JSON file and exit.")
+    parser.add_argument("--language-history", metavar="REPO",
+                        help="Print the language share of REPO over the last --days days from SNAPSHOT_DIR and exit.")
+    parser.add_argument("--days", type=int, default=90, help="Window used by --language-history (default: 90).")
+    parser.add_argument("--stale-since", metavar="YYYY-MM-DD", type=date.fromisoformat,
+                        help="Print repos from SNAPSHOT_DIR that went stale since the given date and exit.")
+    parser.add_argument("--serve-webhooks", action="store_true",
+                        help="Listen for GitHub push/repository webhooks on WEBHOOK_PORT and update DATA_SAVE_PATH until interrupted.")
+    parser.add_argument("--replay-events", metavar="FILE",
+                        help="POST the recorded deliveries in a JSON lines FILE to --webhook-url, signed with WEBHOOK_SECRET, and exit.")
+    parser.add_argument("--webhook-url", default=f"http://127.0.0.1:{os.environ.get('WEBHOOK_PORT', DEFAULT_WEBHOOK_PORT)}{WEBHOOK_PATH}",
+                        help="Receiver used by --replay-events (default: the local receiver).")
+    parser.add_argument("--shard", metavar="I/N", type=parse_shard_spec,
+                        help="Fetch partition I (0-based) of N of GIT_REPOS_LIST_PATH into its own shard file and exit.")
+    parser.add_argument("--shard-dir", metavar="DIR",
+                        help="Where --shard writes shard files (default: SHARD_DIR or ./shards).")
+    parser.add_argument("--merge-shards", metavar="DIR",
+                        help="Merge the shard files in DIR into DATA_SAVE_PATH and exit.")
+    parser.add_argument("--profile", metavar="DIR", nargs="?", const=DEFAULT_PROFILE_DIR,
+                        help=f"Profile data generation, downloads and table updates into DIR (default: {DEFAULT_PROFILE_DIR}). "
+                             "Same as setting PROFILE_DIR.")
+    return parser.parse_args()
+
+def serve_webhooks():
+    initial_data_load_handler()
+    start_metrics_server()
+    snapshot_dir = os.environ.get("SNAPSHOT_DIR")
+    update_queue = RepoUpdateQueue(
+        RepositoryFetcher(scmType="github", headers=HEADERS),
+        os.environ.get("DATA_SAVE_PATH"),
+        snapshot_store=SnapshotStore(snapshot_dir) if snapshot_dir else None,
+        debounce_seconds=float(os.environ.get("WEBHOOK_DEBOUNCE_SECONDS", 10))
+    )
+    server = start_webhook_server(WebhookReceiver(os.environ.get("WEBHOOK_SECRET"), update_queue))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        update_queue.close()
+
+def snapshot_store_from_env():
+    snapshot_dir = os.environ.get("SNAPSHOT_DIR")
+    if not snapshot_dir:
+        raise ValueError("SNAPSHOT_DIR is not set in the environment.")
+    return SnapshotStore(snapshot_dir)
+
 if __name__ == "__main__":
-    run_main_window()
+    args = parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+    if args.export_analytics:
+        export_fleet_analytics(RepoDataset.from_dict(initial_data_load_handler()), args.export_analytics)
+    elif args.language_history:
+        history = snapshot_store_from_env().language_share_history(args.language_history, days=args.days)
+        print(json.dumps([{"taken_at": taken_at.isoformat(), "languages": languages} for taken_at, languages in history], indent=4))
+    elif args.shard:
+        generate_shard(*args.shard, shard_dir=args.shard_dir, headers=HEADERS)
+    elif args.merge_shards:
+        merge_shards(args.merge_shards)
+    elif args.serve_webhooks:
+        serve_webhooks()
+    elif args.replay_events:
+        replay_events(args.replay_events, args.webhook_url, os.environ.get("WEBHOOK_SECRET"))
+    elif args.stale_since:
+        since = datetime.combine(args.stale_since, datetime.min.time())
+        print(json.dumps(snapshot_store_from_env().repos_went_stale(since), indent=4))
+    else:
+        run_main_window()
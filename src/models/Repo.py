@@ -1,17 +1,41 @@
+from datetime import datetime, timezone
+
+
 class Repo:
-    def __init__(self, public_git_url: str, name: str, languages: str, public_scm: str, public_url: str):
+    # __slots__ keeps each record free of a per-instance __dict__; the order here is the JSON key order.
+    __slots__ = ("public_git_url", "name", "languages", "language_bytes", "public_scm", "public_url", "lines_of_code", "private_url", "last_commit_date",
+                 "weekly_commit_activity", "contributor_count", "fetched_at", "fetch_error")
+
+    def __init__(self, public_git_url: str, name: str, languages: dict, public_scm: str, public_url: str):
         self.public_git_url = public_git_url
         self.name = name
-        self.languages = languages  
-        self.public_scm = public_scm  
+        self.languages = languages
+        self.language_bytes = None  # Raw byte counts per language, as returned by the SCM
+        self.public_scm = public_scm
         self.public_url = public_url
         self.lines_of_code = None  # Future state
         self.private_url = None  # Future state
         self.last_commit_date = None # Future state
+        self.weekly_commit_activity = None  # Commits per week over the last year, oldest week first
+        self.contributor_count = None
+        self.fetched_at = None  # UTC ISO timestamp of when the data was read, used to pick the newest copy when merging
+        self.fetch_error = None  # Why the data could not be fetched, for repositories that failed permanently
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Repo":
+        """Inverse of to_dict; keys that aren't Repo fields are ignored."""
+        repo = cls(public_git_url=data.get("public_git_url"), name=data.get("name"), languages=data.get("languages") or {},
+                   public_scm=data.get("public_scm"), public_url=data.get("public_url"))
+        for key in cls.__slots__:
+            if key in data:
+                setattr(repo, key, data[key])
+        return repo
+
+    def mark_fetched(self) -> "Repo":
+        self.fetched_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        return self
 
     def to_dict(self):
         """Convert the repository object to a dictionary format suitable for JSON, excluding None values."""
-        # Return a dictionary representation of instance variables, excluding None values and private/special variables.
-        return {key: value for key, value in self.__dict__.items() if value is not None and not key.startswith('_')}
-    
-    
\ No newline at end of file
+        # Return a dictionary representation of the slot values, excluding None values and private/special attributes.
+        return {key: getattr(self, key) for key in self.__slots__ if getattr(self, key) is not None and not key.startswith('_')}
@@ -0,0 +1,290 @@
+from array import array
+from collections.abc import Mapping
+from datetime import date, datetime, timezone
+from typing import Iterator, Optional
+from models.Repo import Repo
+
+# Value stored in the last commit column for repositories without a known commit date.
+NO_DATE = 0
+# Value stored in the fetched_at column for repositories without a fetch time.
+NO_TIMESTAMP = 0
+# Value stored in the contributor count column for repositories without commit stats.
+NO_COUNT = -1
+
+
+def date_to_ordinal(value: Optional[str]) -> int:
+    """Convert a YYYY-MM-DD string into a proleptic Gregorian ordinal (NO_DATE if missing)."""
+    if not value:
+        return NO_DATE
+    return date.fromisoformat(value[:10]).toordinal()
+
+
+def ordinal_to_date(value: int) -> Optional[str]:
+    """Inverse of date_to_ordinal."""
+    if value == NO_DATE:
+        return None
+    return date.fromordinal(value).isoformat()
+
+
+def timestamp_to_epoch(value: Optional[str]) -> int:
+    """
+    Convert a fetched_at timestamp into epoch seconds (NO_TIMESTAMP if missing).
+
+    Only the UTC, whole-second form written by Repo.mark_fetched survives the round trip through
+    epoch_to_timestamp; anything else also returns NO_TIMESTAMP.
+    """
+    if not value:
+        return NO_TIMESTAMP
+    try:
+        seconds = int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        return NO_TIMESTAMP
+    return seconds if epoch_to_timestamp(seconds) == value else NO_TIMESTAMP
+
+
+def epoch_to_timestamp(value: int) -> Optional[str]:
+    """Inverse of timestamp_to_epoch."""
+    if value == NO_TIMESTAMP:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc).isoformat(timespec="seconds")
+
+
+class RepoDataset(Mapping):
+    """
+    Columnar in-memory store for repository data.
+
+    Each repository is a row. Scalar fields live in one list or array per column, language names and
+    SCM names are interned to small integer ids, and per-repo language percentages and raw byte counts
+    are kept in flat arrays (language_ids / language_percentages / language_bytes) sliced by
+    language_offsets, so a repository costs a few array slots instead of a nested dict of repeated strings.
+    Weekly commit counts are flattened the same way, sliced by commit_activity_offsets, and fetched_at
+    is kept as epoch seconds.
+
+    The dataset behaves as a read-only mapping of repo name -> JSON dict, matching the shape written
+    to DATA_SAVE_PATH, so existing dict-based callers keep working. Rows for replaced or removed
+    repositories are tombstoned and reclaimed by compact().
+    """
+
+    def __init__(self) -> None:
+        self.language_names = []
+        self._language_ids = {}
+        self.scm_names = []
+        self._scm_ids = {}
+
+        self._row_by_name = {}
+        self.names = []
+        self.public_git_urls = []
+        self.scm_ids = array('B')
+        self.last_commit_ordinals = array('i')
+        self.language_offsets = array('I', [0])
+        self.language_ids = array('H')
+        self.language_percentages = array('f')
+        self.language_bytes = array('q')
+        self.has_language_bytes = array('B')
+        self.fetched_at_seconds = array('q')
+        self.contributor_counts = array('i')
+        self.commit_activity_offsets = array('I', [0])
+        self.weekly_commit_counts = array('I')
+        self.has_commit_activity = array('B')
+
+        # Rarely populated columns are kept sparse, keyed by row.
+        self._public_urls = {}
+        self._lines_of_code = {}
+        self._private_urls = {}
+        self._extras = {}
+
+    @classmethod
+    def from_dict(cls, json_data: dict) -> "RepoDataset":
+        """Build a dataset from the JSON shape written by write_json_to_file."""
+        dataset = cls()
+        for repo_name, repo_data in json_data.items():
+            dataset.add(repo_name, repo_data)
+        return dataset
+
+    @classmethod
+    def from_repos(cls, repos) -> "RepoDataset":
+        dataset = cls()
+        for repo in repos:
+            dataset.add_repo(repo)
+        return dataset
+
+    def to_dict(self) -> dict:
+        """Convert back to the JSON shape, e.g. for write_json_to_file."""
+        return {repo_name: self[repo_name] for repo_name in self}
+
+    def intern_language(self, language: str) -> int:
+        language_id = self._language_ids.get(language)
+        if language_id is None:
+            language_id = self._language_ids[language] = len(self.language_names)
+            self.language_names.append(language)
+        return language_id
+
+    def language_id(self, language: str) -> Optional[int]:
+        return self._language_ids.get(language)
+
+    def _intern_scm(self, scm: Optional[str]) -> int:
+        scm = scm or ""
+        scm_id = self._scm_ids.get(scm)
+        if scm_id is None:
+            scm_id = self._scm_ids[scm] = len(self.scm_names)
+            self.scm_names.append(scm)
+        return scm_id
+
+    def add_repo(self, repo: Repo) -> int:
+        return self.add(repo.name, repo.to_dict())
+
+    def add(self, repo_name: str, repo_data: dict) -> int:
+        """Append a repository row, replacing any existing row with the same name. Returns the row index."""
+        row = len(self.names)
+        repo_data = dict(repo_data)
+
+        public_git_url = repo_data.pop("public_git_url", None)
+        public_url = repo_data.pop("public_url", None)
+        languages = repo_data.pop("languages", None) or {}
+        language_bytes = repo_data.pop("language_bytes", None)
+
+        self.names.append(repo_name)
+        self.public_git_urls.append(public_git_url)
+        self.scm_ids.append(self._intern_scm(repo_data.pop("public_scm", None)))
+        self.last_commit_ordinals.append(date_to_ordinal(repo_data.pop("last_commit_date", None)))
+
+        for language, percentage in languages.items():
+            self.language_ids.append(self.intern_language(language))
+            self.language_percentages.append(percentage)
+            self.language_bytes.append(language_bytes.get(language, 0) if language_bytes else 0)
+        self.language_offsets.append(len(self.language_ids))
+        self.has_language_bytes.append(language_bytes is not None)
+
+        weekly_commit_activity = repo_data.pop("weekly_commit_activity", None)
+        self.weekly_commit_counts.extend(weekly_commit_activity or ())
+        self.commit_activity_offsets.append(len(self.weekly_commit_counts))
+        self.has_commit_activity.append(weekly_commit_activity is not None)
+        contributor_count = repo_data.pop("contributor_count", None)
+        self.contributor_counts.append(NO_COUNT if contributor_count is None else contributor_count)
+        fetched_at = repo_data.pop("fetched_at", None)
+        fetched_at_seconds = timestamp_to_epoch(fetched_at)
+        self.fetched_at_seconds.append(fetched_at_seconds)
+        if fetched_at and fetched_at_seconds == NO_TIMESTAMP:
+            # Not in the form mark_fetched writes, so it is kept as it is.
+            repo_data["fetched_at"] = fetched_at
+
+        # public_url is almost always the git url without ".git", so only store it when it differs.
+        if public_url != _derive_public_url(public_git_url):
+            self._public_urls[row] = public_url
+        lines_of_code = repo_data.pop("lines_of_code", None)
+        if lines_of_code is not None:
+            self._lines_of_code[row] = lines_of_code
+        private_url = repo_data.pop("private_url", None)
+        if private_url is not None:
+            self._private_urls[row] = private_url
+
+        repo_data.pop("name", None)
+        if repo_data:
+            self._extras[row] = repo_data
+
+        self._row_by_name[repo_name] = row
+        return row
+
+    def remove(self, repo_name: str) -> None:
+        del self._row_by_name[repo_name]
+
+    def row(self, repo_name: str) -> int:
+        return self._row_by_name[repo_name]
+
+    def rows(self) -> Iterator[int]:
+        """Live row indices in insertion order."""
+        return iter(self._row_by_name.values())
+
+    def language_slice(self, row: int) -> tuple:
+        return self.language_offsets[row], self.language_offsets[row + 1]
+
+    def languages(self, repo_name: str) -> dict:
+        """Language -> percentage for one repository, in the order they were stored."""
+        start, end = self.language_slice(self._row_by_name[repo_name])
+        return {
+            self.language_names[self.language_ids[i]]: round(self.language_percentages[i], 2)
+            for i in range(start, end)
+        }
+
+    def language_byte_counts(self, repo_name: str) -> Optional[dict]:
+        """Language -> raw byte count for one repository, or None if the SCM did not report bytes."""
+        row = self._row_by_name[repo_name]
+        if not self.has_language_bytes[row]:
+            return None
+        start, end = self.language_slice(row)
+        return {self.language_names[self.language_ids[i]]: self.language_bytes[i] for i in range(start, end)}
+
+    def language_percentage(self, repo_name: str, language: str) -> float:
+        language_id = self._language_ids.get(language)
+        if language_id is None:
+            return 0
+        start, end = self.language_slice(self._row_by_name[repo_name])
+        for i in range(start, end):
+            if self.language_ids[i] == language_id:
+                return round(self.language_percentages[i], 2)
+        return 0
+
+    def has_language(self, repo_name: str, language: str) -> bool:
+        language_id = self._language_ids.get(language)
+        if language_id is None:
+            return False
+        start, end = self.language_slice(self._row_by_name[repo_name])
+        return language_id in self.language_ids[start:end]
+
+    def languages_in_use(self) -> list:
+        """Sorted names of languages used by at least one live repository."""
+        used = set()
+        for row in self.rows():
+            start, end = self.language_slice(row)
+            used.update(self.language_ids[start:end])
+        return sorted(self.language_names[language_id] for language_id in used)
+
+    def last_commit_date(self, repo_name: str) -> Optional[str]:
+        return ordinal_to_date(self.last_commit_ordinals[self._row_by_name[repo_name]])
+
+    def weekly_commit_activity(self, repo_name: str) -> Optional[list]:
+        """Commits per week over the last year, oldest first, or None without commit stats."""
+        row = self._row_by_name[repo_name]
+        if not self.has_commit_activity[row]:
+            return None
+        return self.weekly_commit_counts[self.commit_activity_offsets[row]:self.commit_activity_offsets[row + 1]].tolist()
+
+    def compact(self) -> None:
+        """Rebuild the columns without tombstoned rows."""
+        live = dict(self)
+        self.__init__()
+        for repo_name, repo_data in live.items():
+            self.add(repo_name, repo_data)
+
+    def __getitem__(self, repo_name: str) -> dict:
+        row = self._row_by_name[repo_name]
+        public_git_url = self.public_git_urls[row]
+        repo_data = {
+            "public_git_url": public_git_url,
+            "name": repo_name,
+            "languages": self.languages(repo_name),
+            "language_bytes": self.language_byte_counts(repo_name),
+            "public_scm": self.scm_names[self.scm_ids[row]] or None,
+            "public_url": self._public_urls.get(row, _derive_public_url(public_git_url)),
+            "lines_of_code": self._lines_of_code.get(row),
+            "private_url": self._private_urls.get(row),
+            "last_commit_date": ordinal_to_date(self.last_commit_ordinals[row]),
+            "weekly_commit_activity": self.weekly_commit_activity(repo_name),
+            "contributor_count": None if self.contributor_counts[row] == NO_COUNT else self.contributor_counts[row],
+            "fetched_at": epoch_to_timestamp(self.fetched_at_seconds[row]),
+        }
+        repo_data.update(self._extras.get(row, {}))
+        return {key: value for key, value in repo_data.items() if value is not None}
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._row_by_name)
+
+    def __len__(self) -> int:
+        return len(self._row_by_name)
+
+    def __contains__(self, repo_name) -> bool:
+        return repo_name in self._row_by_name
+
+
+def _derive_public_url(public_git_url: Optional[str]) -> Optional[str]:
+    return public_git_url.replace(".git", "") if public_git_url else None
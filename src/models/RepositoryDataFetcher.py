@@ -1,19 +1,82 @@
+import os
 import logging
-from typing import Optional
+import multiprocessing
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator, Optional, Union
 from utils.utils import *
 from utils.git_utils import *
+from utils.metrics import metrics, REPO_FETCH_DURATION, REPO_FETCH_RETRIES, REPO_FETCH_FAILURES
+from utils.profiling import profile_phase
+from utils.commit_stats import CommitStatsCollector, commit_stats_enabled
+from utils.retry import RetryQueue, is_transient, DEFAULT_MAX_RETRIES, DEFAULT_BASE_DELAY, DEFAULT_MAX_DELAY
+from utils.scm_providers import ProviderRegistry
+from utils.credential_pool import CredentialPool
+from utils.repo_urls import RepoUrl, parse_repo_url
+from utils.local_metadata import find_local_clone, read_local_repo
 from models.Repo import Repo
 
 SUPPORTED_SCM_TYPES = ["github", "bitbucket", "gitlab"]
+# Upper bound on queued fetches, so streaming a huge URL list doesn't hold every future in memory.
+MAX_PENDING_FETCHES = 10000
+
+
+def _url_key(public_git_url: Optional[str]) -> Optional[tuple]:
+    try:
+        return parse_repo_url(public_git_url or "").key
+    except ValueError:
+        return None
+
+
+def carry_forward(failed: Repo, previous: Optional[dict]) -> Repo:
+    """
+    The previous entry of a repository that failed permanently, with the failure's fetch_error and fetched_at.
+
+    An outage then leaves the last good data in place instead of erasing it. failed is returned as it is
+    when previous is missing or belongs to another repository with the same name.
+    """
+    if not previous or _url_key(previous.get("public_git_url")) != _url_key(failed.public_git_url):
+        return failed
+    repo = Repo.from_dict(previous)
+    repo.fetch_error = failed.fetch_error
+    repo.fetched_at = failed.fetched_at
+    return repo
 
 class RepositoryFetcher:
 
-    def __init__(self, scmType: str, headers: Optional[dict] = None) -> None:
+    def __init__(self, scmType: str, headers: Optional[dict] = None, credential_pool: Optional[CredentialPool] = None,
+                 local_clone_folder: Optional[str] = None, collect_commit_stats: Optional[bool] = None,
+                 previous_data: Optional[Mapping] = None) -> None:
         if scmType not in SUPPORTED_SCM_TYPES:
             raise ValueError(f"Unsupported SCM type: {scmType}. Supported types: {SUPPORTED_SCM_TYPES}")
         
         self.headers = headers
         self.scmType = scmType
+        # Hosts that can't be recognised from the URL are assumed to be instances of scmType.
+        self.credential_pool = credential_pool or CredentialPool.from_env()
+        self.providers = ProviderRegistry(default_scm=scmType, github_headers=headers, credential_pool=self.credential_pool)
+        # In local metadata mode repos already cloned here are read with git instead of the API.
+        if local_clone_folder is None and os.environ.get("USE_LOCAL_CLONES", "").lower() in ("1", "true", "yes"):
+            local_clone_folder = os.environ.get("GIT_CLONE_FOLDER_PATH")
+        self.local_clone_folder = local_clone_folder
+        # The last run's output (repo name -> JSON dict), so repositories that fail keep their previous data.
+        self.previous_data = previous_data
+        self._local_executor = None
+        self._local_futures = {}
+        self._api_futures = {}
+        if collect_commit_stats is None:
+            collect_commit_stats = commit_stats_enabled()
+        self.commit_stats = CommitStatsCollector.from_env(self.providers) if collect_commit_stats else None
+        self.retry_queue = RetryQueue(
+            max_retries=int(os.environ.get("FETCH_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+            base_delay=float(os.environ.get("FETCH_RETRY_BASE_DELAY", DEFAULT_BASE_DELAY)),
+            max_delay=float(os.environ.get("FETCH_RETRY_MAX_DELAY", DEFAULT_MAX_DELAY))
+        )
+
+    @property
+    def max_retries(self) -> int:
+        """How many times a fetch that failed with a transient error is retried (FETCH_MAX_RETRIES)."""
+        return self.retry_queue.max_retries
 
     def update_url_data(self, url_json_data: dict, target_url: str, update_value: str, key_to_update: Optional[str] = None) -> dict:
         """
@@ -36,34 +99,146 @@ class RepositoryFetcher:
         logging.info(f"Updated URL data for {repo_name}")
         return updated_json_information
 
-    def get_url_data(self, url: str) -> dict:
+    def get_url_data(self, url: Union[RepoUrl, str]) -> dict:
         """
         Fetches repository data for a given URL.
 
-        :param url: The repository URL.
-        :return: A dictionary containing repository details.
+        :param url: The repository URL, either already parsed into a RepoUrl or as a string.
+        :return: The repository details.
+        :raises: Whatever the provider raised if the data could not be fetched; see utils.retry.is_transient.
         """
+        repo_url = url if isinstance(url, RepoUrl) else parse_repo_url(url, self.scmType)
+        provider = self.providers.for_url(repo_url)
         try:
-            owner = get_owner_from_url(url)
-            repo_name = get_repo_name_from_url(url)
-            git_api_handler = GithubAPIHandler(repo_name=repo_name, headers=self.headers, org="use_environment")
-
-            langs = git_api_handler.get_github_repo_languages_stats(owner=owner)
-            public_url = url
-            last_commit = git_api_handler.get_last_commit_date(owner=owner)
-            repo_holder = Repo(
-                public_git_url=url,
-                name=repo_name,
-                languages=langs,
-                public_scm=get_scm_from_url(url),
-                public_url=public_url.replace(".git", "")
-            )
-            repo_holder.last_commit_date = last_commit or None
-            
-            logging.info(f"Successfully fetched URL data for {repo_name}")
+            # Runs on a provider thread, so it is profiled separately from the task that queued it.
+            with profile_phase("fetch_repo"), metrics.timer(REPO_FETCH_DURATION, {"provider": provider.name}):
+                repo_name = repo_url.name.lower()
+
+                language_bytes = provider.get_language_bytes(repo_url.owner, repo_url.name)
+                langs = provider.get_language_percentages(repo_url.owner, repo_url.name, language_bytes)
+                last_commit = provider.get_last_commit_date(repo_url.owner, repo_url.name)
+                repo_holder = Repo(
+                    public_git_url=repo_url.public_git_url,
+                    name=repo_name,
+                    languages=langs,
+                    public_scm=provider.name,
+                    public_url=repo_url.public_url
+                )
+                repo_holder.language_bytes = language_bytes
+                repo_holder.last_commit_date = last_commit or None
         except Exception as e:
-            if "429" in str(e.args[0]).lower() and ("rate limit" or "too many requests") in str(e.args[0]).lower():
-                exit("Rate limit exceeded. Exiting...")
-            logging.error(f"Error fetching data for {url}: {e}")
+            logging.error(f"Error fetching data for {repo_url.url}: {e}")
+            raise
+
+        logging.info(f"Successfully fetched URL data for {repo_name}")
+        return repo_holder.mark_fetched()
+
+    def _failed_repo(self, repo_url: RepoUrl, error: BaseException) -> Repo:
+        """
+        What is written to the output for a repository whose data could not be fetched: its entry in
+        previous_data marked with the fetch_error, or a placeholder without languages if it has none.
+        """
+        repo = Repo(
+            public_git_url=repo_url.public_git_url,
+            name=repo_url.name.lower(),
+            languages={},
+            public_scm=repo_url.scm,
+            public_url=repo_url.public_url
+        )
+        repo.fetch_error = f"{type(error).__name__}: {error}"
+        repo.mark_fetched()
+        return carry_forward(repo, self.previous_data.get(repo.name) if self.previous_data is not None else None)
+
+    def _submit(self, repo_url: RepoUrl, allow_local: bool = True, attempt: int = 0) -> Future:
+        clone_path = find_local_clone(repo_url, self.local_clone_folder) if self.local_clone_folder and allow_local else None
+        if clone_path is None:
+            future = self.providers.for_url(repo_url).executor.submit(self.get_url_data, repo_url)
+            self._api_futures[future] = (repo_url, attempt)
+            return future
+
+        if self._local_executor is None:
+            # spawn rather than fork, since this may run on a worker thread of a Qt application.
+            self._local_executor = ProcessPoolExecutor(
+                max_workers=int(os.environ.get("LOCAL_METADATA_WORKERS", 0)) or None,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        future = self._local_executor.submit(read_local_repo, repo_url, clone_path)
+        self._local_futures[future] = repo_url
+        return future
+
+    def _drain(self, pending: set, max_pending: int) -> Iterator[tuple]:
+        """Yield finished fetches as (RepoUrl, Repo) until fewer than max_pending remain; returns the still pending set."""
+        while pending and len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                repo_url = self._local_futures.pop(future, None)
+                if repo_url is not None and future.exception() is not None:
+                    logging.warning(f"Could not read local clone of {repo_url.url}, using the API instead: {future.exception()}")
+                    pending.add(self._submit(repo_url, allow_local=False))
+                    continue
+                repo_url, attempt = self._api_futures.pop(future, (repo_url, 0))
+                error = future.exception()
+                if error is None:
+                    yield repo_url, future.result()
+                elif is_transient(error) and self.retry_queue.defer(repo_url, attempt + 1, error):
+                    metrics.inc(REPO_FETCH_RETRIES)
+                    logging.warning(f"Fetching {repo_url.url} failed, will retry later (attempt {attempt + 1}): {error}")
+                else:
+                    metrics.inc(REPO_FETCH_FAILURES)
+                    logging.error(f"Giving up on {repo_url.url} after {attempt + 1} attempt(s): {error}")
+                    yield repo_url, self._failed_repo(repo_url, error)
+        return pending
+
+    def fetch_all(self, urls: Iterable[Union[RepoUrl, str]]) -> Iterator[Repo]:
+        """
+        Fetches repository data for many URLs concurrently, yielding each Repo as soon as it is ready.
+
+        Every URL is queued on its provider's own thread pool, so the number of in-flight requests is
+        capped per host and a slow host does not hold up repositories on the others. Repos with a clone
+        in local_clone_folder are read from it in a process pool instead, falling back to the API if
+        that fails. urls may be a lazy iterator; at most MAX_PENDING_FETCHES are queued at once.
+
+        Fetches that fail with a transient error are put on a retry queue and tried again with
+        exponential backoff once the main pass is done. Repositories that still can't be fetched are
+        yielded with a fetch_error, so one bad repository never aborts the run. They keep their data from
+        previous_data if it has any, and have no language data otherwise.
+
+        With commit stats enabled, each Repo is held back until its weekly commit activity and
+        contributor count have been added; see utils.commit_stats.
+        """
+        for _, repo in self.fetch_with_urls(urls):
+            yield repo
+
+    def fetch_with_urls(self, urls: Iterable[Union[RepoUrl, str]]) -> Iterator[tuple]:
+        """Like fetch_all, but yields (RepoUrl, Repo) pairs, so results can be keyed by RepoUrl.key."""
+        fetched = self._fetch_all(urls)
+        if self.commit_stats:
+            fetched = self.commit_stats.attach(fetched)
+        try:
+            yield from fetched
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """
+        Release the providers' thread pools and sessions and stop the local metadata worker processes.
+        The fetcher can still be used afterwards.
+        """
+        self.providers.close()
+        if self._local_executor is not None:
+            self._local_executor.shutdown(cancel_futures=True)
+            self._local_executor = None
+            self._local_futures.clear()
+
+    def _fetch_all(self, urls: Iterable[Union[RepoUrl, str]]) -> Iterator[tuple]:
+        pending = set()
+        for url in urls:
+            repo_url = url if isinstance(url, RepoUrl) else parse_repo_url(url, self.scmType)
+            pending.add(self._submit(repo_url))
+            pending = yield from self._drain(pending, MAX_PENDING_FETCHES)
+        pending = yield from self._drain(pending, 1)
 
-        return repo_holder
+        while self.retry_queue:
+            for repo_url, attempt in self.retry_queue.pop_ready():
+                pending.add(self._submit(repo_url, allow_local=False, attempt=attempt))
+            pending = yield from self._drain(pending, 1)
@@ -0,0 +1,131 @@
+import os
+import time
+import heapq
+import logging
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import count
+from typing import Iterable, Iterator
+from models.Repo import Repo
+from utils.metrics import metrics, REPO_STATS_POLLS
+
+COMMIT_ACTIVITY = "commit_activity"
+CONTRIBUTORS = "contributors"
+REPO_STATS = (COMMIT_ACTIVITY, CONTRIBUTORS)
+# The Repo fields filled in from REPO_STATS.
+REPO_STAT_FIELDS = ("weekly_commit_activity", "contributor_count")
+
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_MAX_POLL_INTERVAL = 30.0
+# Statistics that are still being computed after this long are left out of the output.
+DEFAULT_MAX_WAIT = 300.0
+
+
+def commit_stats_enabled() -> bool:
+    return os.environ.get("COLLECT_COMMIT_STATS", "").lower() in ("1", "true", "yes")
+
+
+def apply_repo_stat(repo: Repo, stat: str, data: list) -> None:
+    """Store the part of a /stats/* response that is kept in the Repo model."""
+    if stat == COMMIT_ACTIVITY:
+        repo.weekly_commit_activity = [week.get("total", 0) for week in data]
+    elif stat == CONTRIBUTORS:
+        # GitHub only lists the top 100 contributors here, so larger projects are reported as 100.
+        repo.contributor_count = len(data)
+
+
+class CommitStatsCollector:
+    """
+    Adds weekly commit activity and contributor counts to Repos as they stream past.
+
+    GitHub computes these statistics in the background and answers 202 until they are ready, so the
+    first request for every repo only starts the computation. Repos are held back until both stats have
+    arrived while their pending requests are polled again on an exponential schedule, in parallel with
+    everything else, so the whole fleet takes about as long as its slowest computation. Polls go to the
+    provider's stats_executor, so they are sent as each repo arrives rather than after the main fetches. Repos on hosts
+    without stats, or whose stats don't arrive within max_wait, are passed through unchanged.
+    """
+
+    def __init__(self, providers, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL, max_wait: float = DEFAULT_MAX_WAIT) -> None:
+        self.providers = providers
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_wait = max_wait
+        self._waiting = {}
+        self._in_flight = {}
+        self._scheduled = []
+        self._sequence = count()
+
+    @classmethod
+    def from_env(cls, providers) -> "CommitStatsCollector":
+        return cls(
+            providers,
+            poll_interval=float(os.environ.get("COMMIT_STATS_POLL_INTERVAL", DEFAULT_POLL_INTERVAL)),
+            max_poll_interval=float(os.environ.get("COMMIT_STATS_MAX_POLL_INTERVAL", DEFAULT_MAX_POLL_INTERVAL)),
+            max_wait=float(os.environ.get("COMMIT_STATS_MAX_WAIT", DEFAULT_MAX_WAIT))
+        )
+
+    def attach(self, fetched: Iterable[tuple]) -> Iterator[tuple]:
+        """
+        Pass through (RepoUrl, Repo) pairs, each one once its repo's statistics have been added or given up on.
+
+        Repos are tracked by RepoUrl.key, since repos of different owners may share a name.
+        """
+        for repo_url, repo in fetched:
+            provider = self.providers.for_url(repo_url)
+            if repo.fetch_error or not provider.supports_repo_stats:
+                yield repo_url, repo
+                continue
+            started_at = time.monotonic()
+            self._waiting[repo_url.key] = (repo, repo_url, provider, started_at, set(REPO_STATS))
+            for stat in REPO_STATS:
+                self._poll(repo_url.key, stat, attempt=0)
+            yield from self._harvest(block=False)
+
+        while self._waiting:
+            yield from self._harvest(block=True)
+
+    def _poll(self, repo_key: tuple, stat: str, attempt: int) -> None:
+        _, repo_url, provider, _, _ = self._waiting[repo_key]
+        future = provider.stats_executor.submit(provider.get_repo_stats, repo_url.owner, repo_url.name, stat)
+        self._in_flight[future] = (repo_key, stat, attempt)
+
+    def _harvest(self, block: bool) -> Iterator[tuple]:
+        now = time.monotonic()
+        while self._scheduled and self._scheduled[0][0] <= now:
+            _, _, repo_key, stat, attempt = heapq.heappop(self._scheduled)
+            self._poll(repo_key, stat, attempt)
+
+        if block:
+            timeout = max(self._scheduled[0][0] - now, 0.0) if self._scheduled else None
+            if not self._in_flight:
+                time.sleep(timeout or 0.0)
+                return
+            done, _ = wait(list(self._in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+        else:
+            done = [future for future in self._in_flight if future.done()]
+
+        for future in done:
+            repo_key, stat, attempt = self._in_flight.pop(future)
+            repo, repo_url, _, started_at, pending = self._waiting[repo_key]
+            error = future.exception()
+            data = None if error else future.result()
+            if error:
+                logging.warning(f"Could not fetch {stat} statistics for {repo_url.url}: {error}")
+                pending.discard(stat)
+            elif data is not None:
+                metrics.inc(REPO_STATS_POLLS, {"stat": stat, "status": "ready"})
+                apply_repo_stat(repo, stat, data)
+                pending.discard(stat)
+            else:
+                metrics.inc(REPO_STATS_POLLS, {"stat": stat, "status": "pending"})
+                delay = min(self.poll_interval * 2 ** attempt, self.max_poll_interval)
+                if time.monotonic() + delay - started_at > self.max_wait:
+                    logging.warning(f"Gave up waiting for {stat} statistics for {repo_url.url}")
+                    pending.discard(stat)
+                else:
+                    heapq.heappush(self._scheduled, (time.monotonic() + delay, next(self._sequence), repo_key, stat, attempt + 1))
+
+            if not pending:
+                del self._waiting[repo_key]
+                yield repo_url, repo
@@ -0,0 +1,103 @@
+import os
+import time
+import logging
+import threading
+from typing import Optional
+import requests
+
+# GitHub's hourly budget for an authenticated token, assumed until a response reports the real one.
+DEFAULT_RATE_LIMIT = 5000
+
+
+class NoCredentialsAvailable(RuntimeError):
+    pass
+
+
+class Credential:
+    __slots__ = ("token", "limit", "remaining", "reset_at", "in_flight", "revoked")
+
+    def __init__(self, token: str, limit: int = DEFAULT_RATE_LIMIT) -> None:
+        self.token = token
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at = 0.0
+        self.in_flight = 0
+        self.revoked = False
+
+    @property
+    def label(self) -> str:
+        """Short identifier that is safe to log."""
+        return f"...{self.token[-4:]}"
+
+    def headroom(self, now: float) -> int:
+        remaining = self.limit if self.reset_at and now >= self.reset_at else self.remaining
+        return remaining - self.in_flight
+
+
+class CredentialPool:
+    """
+    Spreads API requests over several tokens.
+
+    Every request is sent with the token that has the most remaining budget (as reported by the
+    X-RateLimit-* headers of its last response, minus requests still in flight). Tokens that are
+    exhausted sit out until their reset time and tokens rejected with 401 are dropped for the run.
+    """
+
+    def __init__(self, tokens: list) -> None:
+        unique_tokens = list(dict.fromkeys(token for token in tokens if token))
+        if not unique_tokens:
+            raise NoCredentialsAvailable("No API tokens were provided.")
+        self.credentials = [Credential(token) for token in unique_tokens]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, tokens_variable: str = "GIT_API_KEYS", token_variable: str = "GIT_API_KEY") -> Optional["CredentialPool"]:
+        """Build a pool from GIT_API_KEYS (comma separated) plus GIT_API_KEY, or None if neither is set."""
+        tokens = [token.strip() for token in os.environ.get(tokens_variable, "").split(",")]
+        tokens.append(os.environ.get(token_variable))
+        tokens = [token for token in tokens if token]
+        return cls(tokens) if tokens else None
+
+    def acquire(self, exclude: tuple = ()) -> Credential:
+        """Reserve the usable token with the most headroom, skipping any in exclude."""
+        with self._lock:
+            now = time.time()
+            usable = [credential for credential in self.credentials if not credential.revoked]
+            if not usable:
+                raise NoCredentialsAvailable("Every API token in the pool has been revoked.")
+            usable = [credential for credential in usable if credential not in exclude] or usable
+            credential = max(usable, key=lambda credential: credential.headroom(now))
+            credential.in_flight += 1
+            return credential
+
+    def release(self, credential: Credential, response: Optional[requests.Response] = None) -> None:
+        """Return a token to the pool, updating its budget from the response headers."""
+        with self._lock:
+            credential.in_flight -= 1
+            if response is None:
+                return
+            if response.status_code == 401:
+                credential.revoked = True
+                logging.error(f"API token {credential.label} was rejected and has been removed from rotation")
+                return
+            headers = response.headers
+            if "X-RateLimit-Limit" in headers:
+                credential.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Remaining" in headers:
+                credential.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                credential.reset_at = float(headers["X-RateLimit-Reset"])
+            if credential.remaining == 0:
+                logging.warning(f"API token {credential.label} is exhausted until {time.ctime(credential.reset_at)}")
+
+    def has_headroom(self, exclude: tuple = ()) -> bool:
+        """True if some token, other than those in exclude, can still make a request right now."""
+        with self._lock:
+            now = time.time()
+            return any(not credential.revoked and credential not in exclude and credential.headroom(now) > 0
+                       for credential in self.credentials)
+
+    def total_remaining(self) -> int:
+        with self._lock:
+            now = time.time()
+            return sum(max(credential.headroom(now), 0) for credential in self.credentials if not credential.revoked)
@@ -0,0 +1,165 @@
+import logging
+from datetime import date
+from typing import Optional
+import numpy as np
+from models.RepoDataset import RepoDataset, NO_DATE
+from utils.utils import write_json_to_file
+
+# Upper bounds (in days) of the last commit age buckets. The final bucket is open-ended.
+COMMIT_AGE_BUCKETS = (30, 90, 180, 365, 730)
+COOCCURRENCE_CHUNK_ROWS = 4096
+
+
+def _live_entries(dataset: RepoDataset) -> tuple:
+    """
+    Return NumPy copies of the dataset's language columns restricted to live rows.
+
+    The columns are copied rather than wrapped with np.frombuffer: an array.array cannot grow while a
+    buffer view of it is alive, so a view kept by a caller would make RepoDataset.add raise BufferError.
+
+    :return: (live_rows, entry_rows, language_ids, language_bytes, language_percentages) where entry_rows
+             maps every language entry to its position in live_rows.
+    """
+    row_count = len(dataset.names)
+    offsets = np.array(dataset.language_offsets, dtype=np.int64)
+    language_ids = np.array(dataset.language_ids, dtype=np.uint16)
+    language_bytes = np.array(dataset.language_bytes, dtype=np.int64)
+    language_percentages = np.array(dataset.language_percentages, dtype=np.float32)
+
+    # Sorted so that entry_rows is non-decreasing, which lets callers split entries into row chunks.
+    live_rows = np.sort(np.fromiter(dataset.rows(), dtype=np.int64, count=len(dataset)))
+    position = np.full(row_count, -1, dtype=np.int64)
+    position[live_rows] = np.arange(live_rows.size)
+
+    entry_rows = position[np.repeat(np.arange(row_count), np.diff(offsets))]
+    live = entry_rows >= 0
+    return live_rows, entry_rows[live], language_ids[live], language_bytes[live], language_percentages[live]
+
+
+def language_totals(dataset: RepoDataset) -> dict:
+    """
+    Fleet-wide totals per language.
+
+    bytes/share are computed from raw byte counts; mean_percentage averages each repo's percentage
+    over the repos that have languages (failed fetches have none), which still works for data collected
+    before byte counts were stored. Repos without
+    byte counts (GitLab, Bitbucket, older data) add nothing to share, so it is only meaningful when
+    language_bytes_coverage reports bytes for every repo.
+    """
+    _, entry_rows, language_ids, language_bytes, language_percentages = _live_entries(dataset)
+    language_count = len(dataset.language_names)
+
+    total_bytes = np.bincount(language_ids, weights=language_bytes, minlength=language_count)
+    repo_counts = np.bincount(language_ids, minlength=language_count)
+    percentage_sums = np.bincount(language_ids, weights=language_percentages, minlength=language_count)
+
+    fleet_bytes = total_bytes.sum()
+    share = total_bytes / fleet_bytes * 100 if fleet_bytes else np.zeros(language_count)
+    repos_with_languages = np.unique(entry_rows).size
+    mean_percentage = percentage_sums / repos_with_languages if repos_with_languages else np.zeros(language_count)
+
+    order = np.argsort(-total_bytes, kind="stable")
+    return {
+        dataset.language_names[i]: {
+            "bytes": int(total_bytes[i]),
+            "share": round(float(share[i]), 2),
+            "repo_count": int(repo_counts[i]),
+            "mean_percentage": round(float(mean_percentage[i]), 2),
+        }
+        for i in order if repo_counts[i]
+    }
+
+
+def language_bytes_coverage(dataset: RepoDataset) -> dict:
+    """How many live repos have languages, and how many of those also have raw byte counts."""
+    live_rows, entry_rows, _, language_bytes, _ = _live_entries(dataset)
+    has_bytes = np.array(dataset.has_language_bytes, dtype=bool)[live_rows]
+    entry_counts = np.bincount(entry_rows, minlength=live_rows.size)
+    row_bytes = np.bincount(entry_rows, weights=language_bytes, minlength=live_rows.size)
+    with_languages = entry_counts > 0
+    return {
+        "repos_with_languages": int(with_languages.sum()),
+        "repos_with_bytes": int((with_languages & has_bytes & (row_bytes > 0)).sum()),
+    }
+
+
+def language_cooccurrence(dataset: RepoDataset) -> tuple:
+    """
+    Count how many repositories use each pair of languages together.
+
+    :return: (language_names, matrix) where matrix[i][j] is the number of repos using both languages
+             and the diagonal is the number of repos using each language.
+    """
+    live_rows, entry_rows, language_ids, _, _ = _live_entries(dataset)
+    used_ids = np.unique(language_ids)
+    column = np.searchsorted(used_ids, language_ids)
+
+    # Build the repo x language presence matrix in row chunks so memory stays bounded for large fleets.
+    matrix = np.zeros((used_ids.size, used_ids.size), dtype=np.float64)
+    chunk_bounds = np.searchsorted(entry_rows, np.arange(0, live_rows.size + COOCCURRENCE_CHUNK_ROWS, COOCCURRENCE_CHUNK_ROWS))
+    for chunk_index, (start, end) in enumerate(zip(chunk_bounds[:-1], chunk_bounds[1:])):
+        if start == end:
+            continue
+        presence = np.zeros((COOCCURRENCE_CHUNK_ROWS, used_ids.size), dtype=np.float32)
+        presence[entry_rows[start:end] - chunk_index * COOCCURRENCE_CHUNK_ROWS, column[start:end]] = 1
+        matrix += presence.T @ presence
+    return [dataset.language_names[i] for i in used_ids], matrix.astype(np.int64)
+
+
+def commit_age_distribution(dataset: RepoDataset, today: Optional[date] = None) -> dict:
+    """Bucket repositories by days since their last non-bot commit, with summary percentiles."""
+    today = today or date.today()
+    live_rows = np.fromiter(dataset.rows(), dtype=np.int64, count=len(dataset))
+    ordinals = np.array(dataset.last_commit_ordinals, dtype=np.int32)[live_rows]
+    known = ordinals != NO_DATE
+    ages = today.toordinal() - ordinals[known].astype(np.int64)
+
+    edges = np.array(COMMIT_AGE_BUCKETS)
+    counts = np.bincount(np.searchsorted(edges, ages, side="left"), minlength=edges.size + 1)
+    labels = [f"<= {edges[0]} days"]
+    labels += [f"{low + 1}-{high} days" for low, high in zip(edges[:-1], edges[1:])]
+    labels.append(f"> {edges[-1]} days")
+
+    percentiles = {}
+    if ages.size:
+        percentiles = {f"p{p}": int(value) for p, value in zip((50, 90, 99), np.percentile(ages, (50, 90, 99)))}
+    return {
+        "buckets": dict(zip(labels, (int(count) for count in counts))),
+        "unknown": int((~known).sum()),
+        "age_percentiles_days": percentiles,
+    }
+
+
+def compute_fleet_analytics(dataset: RepoDataset, today: Optional[date] = None) -> dict:
+    """Run every fleet analysis and return a JSON-serialisable report."""
+    language_names, matrix = language_cooccurrence(dataset)
+    return {
+        "repo_count": len(dataset),
+        "languages": language_totals(dataset),
+        "language_bytes_coverage": language_bytes_coverage(dataset),
+        "language_cooccurrence": {
+            "languages": language_names,
+            "matrix": matrix.tolist(),
+        },
+        "last_commit_age": commit_age_distribution(dataset, today),
+    }
+
+
+def top_cooccurring_pairs(language_names: list, matrix, limit: int = 10) -> list:
+    """Return the most common (language, language, repo_count) pairs, excluding the diagonal."""
+    matrix = np.asarray(matrix)
+    if not matrix.size:
+        return []
+    upper = np.triu(matrix, k=1)
+    flat_order = np.argsort(upper, axis=None, kind="stable")[::-1][:limit]
+    pairs = []
+    for i, j in zip(*np.unravel_index(flat_order, upper.shape)):
+        if upper[i, j]:
+            pairs.append((language_names[i], language_names[j], int(upper[i, j])))
+    return pairs
+
+
+def export_fleet_analytics(dataset: RepoDataset, file_path: str) -> None:
+    """Write the fleet analytics report as JSON."""
+    write_json_to_file(file_path=file_path, json_obj=compute_fleet_analytics(dataset))
+    logging.info(f"Fleet analytics for {len(dataset)} repositories exported to {file_path}")
@@ -1,41 +1,52 @@
 from dotenv import load_dotenv
 import os
-from utils.utils import create_set_from_txt
-from utils.utils import write_json_to_file
+from utils.repo_urls import load_repo_urls, iter_repo_urls
+from utils.utils import load_json_from_file, write_json_to_file
 from dotenv import load_dotenv
+from utils.metrics import export_metrics, start_metrics_server
+from utils.snapshot_store import record_snapshot
+from utils.profiling import profile_phase
 from models.RepositoryDataFetcher import RepositoryFetcher
+from models.RepoDataset import RepoDataset
 
 load_dotenv()
-GIT_API_KEY = os.environ.get("GIT_API_KEY")
+# Authorization is added per request from the token pool built from GIT_API_KEYS / GIT_API_KEY.
 HEADERS = {
     'Accept': 'application/vnd.github.v3+json',
-    'Authorization': f'Bearer {GIT_API_KEY}',
     'X-GitHub-Api-Version': '2022-11-28'
 }
 
 def get_git_repo_url(repo_file_path):
-    return create_set_from_txt(repo_file_path)
+    return load_repo_urls(repo_file_path)
 
 def collect_data(git_urls,repository_fetcher):
-    git_repo_data = []
-    for git_url in git_urls:
-        data = repository_fetcher.get_url_data(git_url)
-        git_repo_data.append(data)
+    git_repo_data = list(repository_fetcher.fetch_all(git_urls))
+    # Results arrive in completion order; keep the output ordered by repo name as before.
+    git_repo_data.sort(key=lambda repo: repo.name)
     return git_repo_data
 
 def aggregate_repo_data(repo_data_list):
-    combined_repo_data = {}
+    return RepoDataset.from_repos(repo_data_list)
 
-    for repo_data in repo_data_list:
-        json_repo_data = repo_data.to_dict()       
-        combined_repo_data[repo_data.name] = json_repo_data
-    return combined_repo_data
+def load_previous_data(data_path):
+    """The output of the last run as a RepoDataset, or an empty one if there is none yet."""
+    if not data_path or not os.path.exists(data_path) or not os.path.getsize(data_path):
+        return RepoDataset()
+    return RepoDataset.from_dict(load_json_from_file(data_path))
 
 
 def generate_data():
-    git_urls = get_git_repo_url(os.environ.get("GIT_REPOS_LIST_PATH"))
-    data_fetcher = RepositoryFetcher(scmType="github", headers=HEADERS)
+    with profile_phase("generate_data"):
+        start_metrics_server()
+        # Stream the list rather than loading it, so large org exports are parsed lazily in one pass.
+        git_urls = iter_repo_urls(os.environ.get("GIT_REPOS_LIST_PATH"))
+        # Repos that fail this time keep what the last run wrote for them.
+        previous_data = load_previous_data(os.environ.get("DATA_SAVE_PATH"))
+        data_fetcher = RepositoryFetcher(scmType="github", headers=HEADERS, previous_data=previous_data)
     
-    repo_data = collect_data(git_urls, data_fetcher)
-    aggregated_data = aggregate_repo_data(repo_data)
-    write_json_to_file(json_obj=aggregated_data, file_path=os.environ.get("DATA_SAVE_PATH"))
\ No newline at end of file
+        repo_data = collect_data(git_urls, data_fetcher)
+        aggregated_data = aggregate_repo_data(repo_data)
+        json_data = aggregated_data.to_dict()
+        write_json_to_file(json_obj=json_data, file_path=os.environ.get("DATA_SAVE_PATH"))
+        record_snapshot(json_data)
+        export_metrics()
@@ -5,6 +5,11 @@ from dotenv import load_dotenv
 from typing import Any, Optional
 import subprocess
 import re
+from utils.metrics import metrics, endpoint_label, HTTP_REQUEST_DURATION, HTTP_RESPONSES, HTTP_RETRIES, RATE_LIMIT_HITS, GIT_COMMAND_DURATION
+from utils.rate_limit import RateLimitPolicy, rate_limit_delay
+from utils.credential_pool import CredentialPool
+from utils.mirror_cache import MirrorCache
+from utils.retry import CircuitBreaker, is_server_failure
 
 load_dotenv()
 
@@ -12,6 +17,102 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 
 
+BOT_NAME_PATTERN = re.compile(r'\[bot\]', re.IGNORECASE)
+
+
+def is_bot_commit(author_name: str, committer_name: str) -> bool:
+    """Commits whose author or committer name contains '[bot]' are excluded from activity dates."""
+    return bool(BOT_NAME_PATTERN.search(author_name or '') or BOT_NAME_PATTERN.search(committer_name or ''))
+
+
+def calculate_language_percentages(language_bytes: dict) -> dict:
+    """Convert language -> byte count into language -> percentage of all bytes, rounded to 2 places."""
+    total_lines = sum(language_bytes.values())
+    if not total_lines:
+        # e.g. a local clone whose only recognised files are empty.
+        return {}
+    percentages = {k: round((v / total_lines) * 100, 2) for k, v in language_bytes.items()}
+    return percentages
+
+
+def scm_request(method: str, url: str, headers: Optional[dict] = None, session: Optional[requests.Session] = None,
+                rate_limit_policy: Optional[RateLimitPolicy] = None, credential_pool: Optional[CredentialPool] = None,
+                circuit_breaker: Optional[CircuitBreaker] = None, accepted_statuses: tuple = (200,),
+                **kwargs) -> requests.Response:
+    """
+    Send a request to an SCM API, recording metrics and honouring the host's rate limit policy.
+
+    With a credential pool, each attempt is authorised with the token that has the most headroom, and a
+    request rejected because its token is exhausted or revoked is retried straight away with another one.
+    Other rate-limited responses (e.g. a secondary limit with Retry-After) are left to the rate limit policy.
+    With a circuit breaker, server errors and connection failures count against the host and nothing is
+    sent while its circuit is open (utils.retry.CircuitOpen is raised instead).
+    Raises requests.HTTPError for any response whose status is not in accepted_statuses and that is not retried.
+    """
+    logging.info(f"Making a request to: {url}")
+    endpoint = endpoint_label(url)
+    attempt = 0
+    spent_credentials = []
+    while True:
+        if circuit_breaker:
+            circuit_breaker.before_request()
+        if rate_limit_policy:
+            rate_limit_policy.wait()
+        request_headers = headers
+        credential = None
+        response = None
+        if credential_pool:
+            credential = credential_pool.acquire(exclude=spent_credentials)
+            request_headers = {**(headers or {}), "Authorization": f"Bearer {credential.token}"}
+        try:
+            with metrics.timer(HTTP_REQUEST_DURATION, {"endpoint": endpoint, "method": method}):
+                response = (session or requests).request(method, url, headers=request_headers, **kwargs)
+        finally:
+            if credential:
+                credential_pool.release(credential, response)
+            if circuit_breaker:
+                if is_server_failure(response):
+                    circuit_breaker.record_failure()
+                else:
+                    circuit_breaker.record_success()
+        metrics.inc(HTTP_RESPONSES, {"endpoint": endpoint, "status": str(response.status_code)})
+
+        rate_limited = rate_limit_delay(response) is not None
+        if rate_limited:
+            metrics.inc(RATE_LIMIT_HITS)
+        token_spent = credential is not None and (response.status_code == 401 or (rate_limited and credential.remaining == 0))
+        if token_spent:
+            spent_credentials.append(credential)
+        if (token_spent and attempt < len(credential_pool.credentials)
+                and credential_pool.has_headroom(exclude=spent_credentials)):
+            # Another token can take this request without waiting.
+            retry = True
+        elif rate_limited and rate_limit_policy:
+            retry = rate_limit_policy.should_retry(response, attempt)
+        else:
+            retry = False
+        if not retry:
+            break
+        attempt += 1
+        metrics.inc(HTTP_RETRIES, {"endpoint": endpoint})
+
+    if response.status_code not in accepted_statuses:
+        logging.error(f"Request to {url} failed with status code {response.status_code}: {response.text}")
+        response.raise_for_status()
+    return response
+
+
+def git_subcommand(git_command: list) -> str:
+    """The git subcommand of an argument list, skipping global options such as `-C <path>`."""
+    arguments = iter(git_command[1:])
+    for argument in arguments:
+        if argument in ('-C', '-c'):
+            next(arguments, None)
+        elif not argument.startswith('-'):
+            return argument
+    return git_command[0]
+
+
 class GitCommands:
     STATUS = "status"
     FULL_PUSH = "full_push"
@@ -19,6 +120,10 @@ class GitCommands:
 
 
 class GithubActionManager:
+
+    def __init__(self, mirror_cache: Optional[MirrorCache] = None) -> None:
+        # With GIT_MIRROR_CACHE_PATH set, clones are checked out of a local bare mirror of the repo.
+        self.mirror_cache = mirror_cache or MirrorCache.from_env()
     
     def _git_command_result_handler(self, command: str, result: subprocess.CompletedProcess) -> Any:
         if command == GitCommands.STATUS:
@@ -40,11 +145,16 @@ class GithubActionManager:
                 ['git', "push", "-u", "origin"]
             ])
         elif command == GitCommands.CLONE and git_url:
-            git_commands.append(['git', 'clone', git_url])
+            mirror_path = self.mirror_cache.ensure_mirror(git_url) if self.mirror_cache else None
+            if mirror_path:
+                git_commands.extend(self.mirror_cache.clone_commands(git_url, mirror_path))
+            else:
+                git_commands.append(['git', 'clone', git_url])
         
         for git_command in git_commands:
             try:
-                result = subprocess.run(git_command, check=True, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=working_directory)
+                with metrics.timer(GIT_COMMAND_DURATION, {"command": git_subcommand(git_command)}):
+                    result = subprocess.run(git_command, check=True, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=working_directory)
                 results.append(self._git_command_result_handler(command, result))
             except subprocess.CalledProcessError as e:
                 results.append(f"Error running Git command: {e}\nGIT {command} error output:\n{e.stderr}")
@@ -54,19 +164,22 @@ class GithubActionManager:
 
 class GithubAPIHandler:
     
-    def __init__(self, headers: dict, repo_name: Optional[str] = None, org: Optional[str] = None) -> None:
+    def __init__(self, headers: dict, repo_name: Optional[str] = None, org: Optional[str] = None,
+                 base_url: str = "https://api.github.com", session: Optional[requests.Session] = None,
+                 rate_limit_policy: Optional[RateLimitPolicy] = None, credential_pool: Optional[CredentialPool] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None) -> None:
         self.headers = headers
         self.repo_name = repo_name
         self.org_name = self.set_org_name(org)
-        self.base_url_endpoint = "https://api.github.com"
+        self.base_url_endpoint = base_url
+        self.session = session
+        self.rate_limit_policy = rate_limit_policy
+        self.credential_pool = credential_pool
+        self.circuit_breaker = circuit_breaker
 
     def _request(self, method: str, url: str, **kwargs) -> requests.Response:
-        logging.info(f"Making a request to: {url}")
-        response = requests.request(method, url, headers=self.headers, **kwargs)
-        if response.status_code != 200:
-            logging.error(f"Request to {url} failed with status code {response.status_code}: {response.text}")
-            response.raise_for_status()
-        return response
+        return scm_request(method, url, headers=self.headers, session=self.session, rate_limit_policy=self.rate_limit_policy,
+                           credential_pool=self.credential_pool, circuit_breaker=self.circuit_breaker, **kwargs)
 
     def remote_github_repo_exists(self) -> dict:
         self._ensure_req_info()
@@ -98,7 +211,7 @@ class GithubAPIHandler:
                 logging.error(f"Error getting commit data: {e}")
                 #print(commit)
             # Exclude commits by bots (login containing 'bot')
-            if not re.search(r'\[bot\]', author_name, re.IGNORECASE) and not re.search(r'\[bot\]', committer_name, re.IGNORECASE):
+            if not is_bot_commit(author_name, committer_name):
                 author_date = commit['commit']['author']['date']
                 if not non_bot_commit_date or author_date > non_bot_commit_date:
                     non_bot_commit_date = author_date
@@ -106,20 +219,41 @@ class GithubAPIHandler:
                 # print(author_name, committer_name)
                 pass
             
-        return non_bot_commit_date.split("T")[0]
+        return non_bot_commit_date.split("T")[0] if non_bot_commit_date else None
 
     
+    def get_github_repo_stats(self, stat: str, owner: Optional[str] = None) -> Optional[list]:
+        """
+        One of the /stats/* endpoints (e.g. "commit_activity", "contributors").
+
+        GitHub answers 202 while it computes the statistics in the background; None is returned in that
+        case and the caller should ask again later. Empty repositories answer 204 and give [].
+        """
+        self._ensure_req_info()
+        owner = owner or self.org
+        url = f"{self.base_url_endpoint}/repos/{owner}/{self.repo_name}/stats/{stat}"
+        response = self._request('GET', url, accepted_statuses=(200, 202, 204))
+        if response.status_code == 202:
+            return None
+        if response.status_code == 204 or not response.content:
+            return []
+        return response.json()
+
     def get_github_repo_languages_stats(self, owner: Optional[str] = None) -> dict:
+        return self.language_percentages(self.get_github_repo_language_bytes(owner=owner))
+
+    def get_github_repo_language_bytes(self, owner: Optional[str] = None) -> dict:
         self._ensure_req_info()
         owner = owner or self.org
         url = f"{self.base_url_endpoint}/repos/{owner}/{self.repo_name}/languages"
         response = self._request('GET', url)
-        return self.__set_languague_percentages(response.json())
+        return response.json()
+
+    def language_percentages(self, language_bytes: dict) -> dict:
+        return self.__set_languague_percentages(language_bytes)
     
     def __set_languague_percentages(self, response_data: dict) -> dict:
-        total_lines = sum(response_data.values())
-        percentages = {k: round((v / total_lines) * 100, 2) for k, v in response_data.items()}
-        return percentages
+        return calculate_language_percentages(response_data)
 
     def set_repo_name(self, repo_name: Optional[str] = None) -> None:
         if not repo_name:
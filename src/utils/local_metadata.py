@@ -0,0 +1,132 @@
+import os
+import logging
+import subprocess
+from datetime import datetime, timezone
+from typing import Optional
+from models.Repo import Repo
+from utils.git_utils import is_bot_commit, calculate_language_percentages
+from utils.repo_urls import RepoUrl, parse_repo_url
+
+# How many recent commits are scanned for the latest non-bot commit, roughly one page of the commits API.
+LOCAL_COMMIT_SCAN_LIMIT = 100
+
+# Directories that GitHub's language stats treat as vendored and leave out.
+VENDORED_PATH_PREFIXES = ("vendor/", "node_modules/", "third_party/", "thirdparty/", "bower_components/")
+
+EXTENSION_LANGUAGES = {
+    ".py": "Python", ".pyx": "Cython", ".ipynb": "Jupyter Notebook",
+    ".java": "Java", ".kt": "Kotlin", ".kts": "Kotlin", ".scala": "Scala", ".groovy": "Groovy", ".gradle": "Groovy",
+    ".js": "JavaScript", ".mjs": "JavaScript", ".cjs": "JavaScript", ".jsx": "JavaScript",
+    ".ts": "TypeScript", ".tsx": "TypeScript", ".vue": "Vue", ".svelte": "Svelte",
+    ".html": "HTML", ".htm": "HTML", ".css": "CSS", ".scss": "SCSS", ".sass": "Sass", ".less": "Less",
+    ".go": "Go", ".rs": "Rust", ".rb": "Ruby", ".php": "PHP", ".pl": "Perl", ".pm": "Perl", ".lua": "Lua",
+    ".c": "C", ".h": "C", ".cc": "C++", ".cpp": "C++", ".cxx": "C++", ".hpp": "C++", ".hh": "C++",
+    ".cs": "C#", ".fs": "F#", ".vb": "Visual Basic .NET", ".swift": "Swift", ".m": "Objective-C", ".mm": "Objective-C++",
+    ".sh": "Shell", ".bash": "Shell", ".zsh": "Shell", ".ps1": "PowerShell", ".psm1": "PowerShell", ".bat": "Batchfile",
+    ".sql": "SQL", ".r": "R", ".jl": "Julia", ".dart": "Dart", ".ex": "Elixir", ".exs": "Elixir", ".erl": "Erlang",
+    ".hs": "Haskell", ".clj": "Clojure", ".ml": "OCaml", ".tf": "HCL", ".hcl": "HCL", ".proto": "Protocol Buffer",
+    ".mk": "Makefile", ".cmake": "CMake", ".tex": "TeX", ".vim": "Vim Script", ".sol": "Solidity", ".zig": "Zig",
+}
+
+FILENAME_LANGUAGES = {
+    "dockerfile": "Dockerfile",
+    "makefile": "Makefile",
+    "gnumakefile": "Makefile",
+    "cmakelists.txt": "CMake",
+    "jenkinsfile": "Groovy",
+    "rakefile": "Ruby",
+    "gemfile": "Ruby",
+}
+
+
+def language_for_path(path: str) -> Optional[str]:
+    """Guess a file's language from its name or extension, or None if it isn't source code we count."""
+    if path.startswith(VENDORED_PATH_PREFIXES) or any(f"/{prefix}" in path for prefix in VENDORED_PATH_PREFIXES):
+        return None
+    filename = path.rsplit("/", 1)[-1].lower()
+    if filename in FILENAME_LANGUAGES:
+        return FILENAME_LANGUAGES[filename]
+    if filename.startswith("dockerfile."):
+        return "Dockerfile"
+    return EXTENSION_LANGUAGES.get(os.path.splitext(filename)[1])
+
+
+def _git(clone_path: str, *args: str) -> str:
+    return subprocess.run(['git', *args], check=True, text=True, encoding='utf-8', errors='replace',
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=clone_path).stdout
+
+
+def get_local_last_commit_date(clone_path: str) -> Optional[str]:
+    """Latest author date (UTC, YYYY-MM-DD) among recent non-bot commits, from a single git log call."""
+    output = _git(clone_path, 'log', f'-n{LOCAL_COMMIT_SCAN_LIMIT}', '--format=%an%x1f%cn%x1f%at')
+    latest_timestamp = None
+    for line in output.splitlines():
+        author_name, committer_name, author_timestamp = line.split('\x1f')
+        if is_bot_commit(author_name, committer_name):
+            continue
+        if latest_timestamp is None or int(author_timestamp) > latest_timestamp:
+            latest_timestamp = int(author_timestamp)
+    if latest_timestamp is None:
+        return None
+    return datetime.fromtimestamp(latest_timestamp, tz=timezone.utc).date().isoformat()
+
+
+def get_local_language_bytes(clone_path: str) -> dict:
+    """Byte counts per language for every blob in HEAD's tree, without touching the working copy."""
+    output = _git(clone_path, 'ls-tree', '-r', '-l', '-z', 'HEAD')
+    language_bytes = {}
+    for entry in output.split('\0'):
+        if not entry:
+            continue
+        metadata, path = entry.split('\t', 1)
+        _, object_type, _, size = metadata.split()
+        if object_type != 'blob':
+            continue
+        language = language_for_path(path)
+        if language:
+            language_bytes[language] = language_bytes.get(language, 0) + int(size)
+    return dict(sorted(language_bytes.items(), key=lambda item: item[1], reverse=True))
+
+
+def get_origin_key(clone_path: str) -> Optional[tuple]:
+    """RepoUrl.key of the clone's origin remote, or None if it has no origin that parses as a repository URL."""
+    try:
+        return parse_repo_url(_git(clone_path, 'remote', 'get-url', 'origin').strip()).key
+    except (subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def find_local_clone(repo_url: RepoUrl, clone_folder: str) -> Optional[str]:
+    """
+    Path of the clone `git clone` would have created for repo_url in clone_folder, if it exists.
+
+    The folder is flat, so a clone is only used if its origin is repo_url itself and not a fork or
+    another owner's repository with the same name.
+    """
+    for name in (repo_url.name, repo_url.name.lower()):
+        clone_path = os.path.join(clone_folder, name)
+        if not os.path.isdir(os.path.join(clone_path, '.git')):
+            continue
+        if get_origin_key(clone_path) == repo_url.key:
+            return clone_path
+        logging.info(f"Not reading {clone_path} for {repo_url.url}: its origin is a different repository")
+    return None
+
+
+def read_local_repo(repo_url: RepoUrl, clone_path: str) -> Repo:
+    """
+    Build a Repo from a local clone instead of the SCM API.
+
+    Runs in a worker process, so it only takes and returns picklable values.
+    """
+    language_bytes = get_local_language_bytes(clone_path)
+    repo = Repo(
+        public_git_url=repo_url.public_git_url,
+        name=repo_url.name.lower(),
+        languages=calculate_language_percentages(language_bytes),
+        public_scm=repo_url.scm,
+        public_url=repo_url.public_url
+    )
+    repo.language_bytes = language_bytes
+    repo.last_commit_date = get_local_last_commit_date(clone_path)
+    return repo.mark_fetched()
@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse
+
+# Upper bounds (in seconds) for latency histograms. The implicit last bucket is +Inf.
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_PREFIX = "repo_stats"
+
+HTTP_REQUEST_DURATION = "http_request_duration_seconds"
+HTTP_RESPONSES = "http_responses_total"
+HTTP_RETRIES = "http_retries_total"
+RATE_LIMIT_HITS = "rate_limit_hits_total"
+RATE_LIMIT_SLEEPS = "rate_limit_sleeps_total"
+RATE_LIMIT_SLEEP_SECONDS = "rate_limit_sleep_seconds_total"
+REPO_FETCH_DURATION = "repo_fetch_duration_seconds"
+GIT_COMMAND_DURATION = "git_command_duration_seconds"
+LOC_COUNT_DURATION = "loc_count_duration_seconds"
+REPO_FETCH_RETRIES = "repo_fetch_retries_total"
+REPO_FETCH_FAILURES = "repo_fetch_failures_total"
+CIRCUIT_BREAKER_OPENED = "circuit_breaker_opened_total"
+WEBHOOK_EVENTS = "webhook_events_total"
+REPO_STATS_POLLS = "repo_stats_polls_total"
+
+METRIC_HELP = {
+    HTTP_REQUEST_DURATION: "Latency of SCM API requests by endpoint.",
+    HTTP_RESPONSES: "SCM API responses by endpoint and status code.",
+    HTTP_RETRIES: "SCM API requests that were retried.",
+    RATE_LIMIT_HITS: "Responses that reported an exhausted rate limit.",
+    RATE_LIMIT_SLEEPS: "Times the fetcher slept waiting for a rate limit to reset.",
+    RATE_LIMIT_SLEEP_SECONDS: "Total seconds spent sleeping on rate limits.",
+    REPO_FETCH_DURATION: "Time taken to fetch all data for a single repository.",
+    GIT_COMMAND_DURATION: "Duration of git subprocess calls by command.",
+    LOC_COUNT_DURATION: "Time taken to count lines of code with scc.",
+    REPO_FETCH_RETRIES: "Repository fetches deferred to the retry queue.",
+    REPO_FETCH_FAILURES: "Repositories whose data could not be fetched.",
+    CIRCUIT_BREAKER_OPENED: "Times a host's circuit breaker opened.",
+    WEBHOOK_EVENTS: "Webhook deliveries received by event and outcome.",
+    REPO_STATS_POLLS: "Requests for repository statistics by stat and whether they were ready.",
+}
+
+# Path segments that are followed by identifiers which should not become label values.
+_ENDPOINT_PLACEHOLDERS = {
+    "repos": ("{owner}", "{repo}"),
+    "orgs": ("{org}",),
+    "users": ("{user}",),
+    "projects": ("{project}",),
+    "repositories": ("{workspace}", "{repo}"),
+}
+
+
+def endpoint_label(url: str) -> str:
+    """
+    Collapse a request URL into a low-cardinality endpoint label.
+
+    e.g. https://api.github.com/repos/octo/hello/languages -> /repos/{owner}/{repo}/languages
+    """
+    segments = [segment for segment in urlparse(url).path.split("/") if segment]
+    labelled = []
+    index = 0
+    while index < len(segments):
+        segment = segments[index]
+        labelled.append(segment)
+        placeholders = _ENDPOINT_PLACEHOLDERS.get(segment, ())
+        for placeholder in placeholders:
+            index += 1
+            if index < len(segments):
+                labelled.append(placeholder)
+        index += 1
+    return "/" + "/".join(labelled)
+
+
+class Histogram:
+    """Fixed-bucket histogram; observing a value is a single bisect plus two additions."""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process store for counters and histograms.
+
+    Labels are passed as plain dicts and stored as sorted tuples so they can be used as keys.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self.started_at = time.time()
+        self._declare_counters()
+
+    def _declare_counters(self) -> None:
+        # Counters for rare events are exported as 0 so dashboards can tell "none" from "missing".
+        for name in (HTTP_RETRIES, RATE_LIMIT_HITS, RATE_LIMIT_SLEEPS, RATE_LIMIT_SLEEP_SECONDS, REPO_FETCH_RETRIES, REPO_FETCH_FAILURES):
+            self._counters.setdefault((name, ()), 0)
+
+    @staticmethod
+    def _key(name: str, labels: Optional[dict]) -> tuple:
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def inc(self, name: str, labels: Optional[dict] = None, amount: float = 1) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Optional[dict] = None) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, labels: Optional[dict] = None):
+        """Observe the wall-clock duration of the wrapped block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+            self._declare_counters()
+
+    def to_prometheus_text(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in self._histograms.items()}
+
+        lines = []
+        for metric_type, series in (("counter", counters), ("histogram", histograms)):
+            for name in sorted({name for name, _ in series}):
+                full_name = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# HELP {full_name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {full_name} {metric_type}")
+                for (series_name, labels), value in sorted(series.items()):
+                    if series_name != name:
+                        continue
+                    if metric_type == "counter":
+                        lines.append(f"{full_name}{_format_labels(labels)} {value}")
+                        continue
+                    counts, total, count, buckets = value
+                    cumulative = 0
+                    for upper_bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                        cumulative += bucket_count
+                        le = "+Inf" if upper_bound == float("inf") else repr(upper_bound)
+                        lines.append(f"{full_name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{full_name}_sum{_format_labels(labels)} {total}")
+                    lines.append(f"{full_name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """Return a JSON-serialisable run summary with totals and means per series, slowest first."""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum_seconds": round(histogram.sum, 6),
+                    "mean_seconds": round(histogram.sum / histogram.count, 6) if histogram.count else 0.0,
+                }
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        histograms.sort(key=lambda entry: entry["sum_seconds"], reverse=True)
+        return {
+            "started_at": self.started_at,
+            "duration_seconds": round(time.time() - self.started_at, 3),
+            "counters": counters,
+            "timings": histograms,
+        }
+
+    def write_prometheus_file(self, file_path: str) -> None:
+        _atomic_write(file_path, self.to_prometheus_text())
+        logging.info(f"Prometheus metrics written to {file_path}")
+
+    def write_json_summary(self, file_path: str) -> None:
+        _atomic_write(file_path, json.dumps(self.summary(), indent=4))
+        logging.info(f"Run summary written to {file_path}")
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _atomic_write(file_path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(content)
+    os.replace(temp_path, file_path)
+
+
+metrics = MetricsRegistry()
+
+
+def export_metrics(output_dir: Optional[str] = None) -> None:
+    """
+    Write metrics.prom and run_summary.json to output_dir (or METRICS_OUTPUT_DIR).
+
+    Does nothing when no directory is configured.
+    """
+    output_dir = output_dir or os.environ.get("METRICS_OUTPUT_DIR")
+    if not output_dir:
+        return
+    metrics.write_prometheus_file(os.path.join(output_dir, "metrics.prom"))
+    metrics.write_json_summary(os.path.join(output_dir, "run_summary.json"))
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.to_prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics on a daemon thread if a port is given or METRICS_PORT is set."""
+    port = port or int(os.environ.get("METRICS_PORT", 0))
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
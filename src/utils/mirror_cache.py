@@ -0,0 +1,159 @@
+import os
+import time
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union
+from utils.metrics import metrics, GIT_COMMAND_DURATION
+from utils.repo_urls import RepoUrl, parse_repo_url
+from utils.utils import force_rmtree
+
+LAST_USED_MARKER = "repo-stats-last-used"
+LAST_FETCHED_MARKER = "repo-stats-last-fetched"
+DEFAULT_MAX_GB = 20
+DEFAULT_FETCH_WORKERS = 8
+# Mirrors fetched more recently than this are considered fresh and are not fetched again.
+DEFAULT_REFRESH_INTERVAL = 300
+
+
+class MirrorCache:
+    """
+    Cache of bare `git clone --mirror` repositories.
+
+    User-facing clones are made from the mirror on local disk, so only the first download of a repo
+    pays for its full history over the network; later downloads cost an incremental fetch at most.
+    Local clones hardlink the mirror's objects rather than borrowing them through --shared/--reference,
+    so evicting a mirror never breaks a checkout that was made from it. Mirrors that have not been
+    used recently are evicted once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_GB * 1024 ** 3,
+                 refresh_interval: float = DEFAULT_REFRESH_INTERVAL, fetch_workers: int = DEFAULT_FETCH_WORKERS) -> None:
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.refresh_interval = refresh_interval
+        self.fetch_workers = fetch_workers
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["MirrorCache"]:
+        """Build a cache from GIT_MIRROR_CACHE_PATH, or None if mirroring isn't configured."""
+        cache_dir = os.environ.get("GIT_MIRROR_CACHE_PATH")
+        if not cache_dir:
+            return None
+        return cls(
+            cache_dir,
+            max_bytes=int(float(os.environ.get("GIT_MIRROR_CACHE_MAX_GB", DEFAULT_MAX_GB)) * 1024 ** 3),
+            refresh_interval=float(os.environ.get("GIT_MIRROR_REFRESH_INTERVAL", DEFAULT_REFRESH_INTERVAL)),
+            fetch_workers=int(os.environ.get("GIT_MIRROR_FETCH_WORKERS", DEFAULT_FETCH_WORKERS)),
+        )
+
+    def mirror_path(self, repo_url: RepoUrl) -> str:
+        # Keep every part of the path inside cache_dir, whatever the URL contained.
+        parts = [repo_url.host, *repo_url.owner.lower().split("/"), f"{repo_url.name.lower()}.git"]
+        return os.path.join(self.cache_dir, *(part for part in parts if part not in ("", ".", "..")))
+
+    def _lock_for(self, mirror_path: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(mirror_path, threading.Lock())
+
+    def _run_git(self, label: str, git_command: list) -> None:
+        with metrics.timer(GIT_COMMAND_DURATION, {"command": label}):
+            subprocess.run(git_command, check=True, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def ensure_mirror(self, url: Union[RepoUrl, str]) -> Optional[str]:
+        """
+        Create or refresh the mirror for a repository and return its path.
+
+        A stale but existing mirror is still returned if the fetch fails, since it is better than
+        nothing; None is only returned when no mirror exists at all.
+        """
+        repo_url = url if isinstance(url, RepoUrl) else parse_repo_url(url)
+        mirror_path = self.mirror_path(repo_url)
+        with self._lock_for(mirror_path):
+            exists = os.path.isdir(mirror_path)
+            try:
+                if not exists:
+                    os.makedirs(os.path.dirname(mirror_path), exist_ok=True)
+                    self._run_git("clone --mirror", ['git', 'clone', '--mirror', repo_url.public_git_url, mirror_path])
+                    _touch(mirror_path, LAST_FETCHED_MARKER)
+                elif time.time() - _marker_time(mirror_path, LAST_FETCHED_MARKER) > self.refresh_interval:
+                    self._run_git("fetch", ['git', '-C', mirror_path, 'fetch', '--prune', '--quiet'])
+                    _touch(mirror_path, LAST_FETCHED_MARKER)
+            except subprocess.CalledProcessError as e:
+                logging.error(f"Error updating mirror of {repo_url.url}: {e.stderr}")
+                if not exists:
+                    if os.path.isdir(mirror_path):
+                        force_rmtree(mirror_path)
+                    return None
+            _touch(mirror_path, LAST_USED_MARKER)
+        return mirror_path
+
+    def refresh(self, urls: list) -> dict:
+        """Create or fetch the mirrors for many repositories in parallel, then evict cold mirrors."""
+        with ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="mirror-fetch") as executor:
+            mirror_paths = dict(zip(urls, executor.map(self.ensure_mirror, urls)))
+        self.evict()
+        return mirror_paths
+
+    def clone_commands(self, url: Union[RepoUrl, str], mirror_path: str) -> list:
+        """git commands that check a repository out of its mirror, with origin pointing at the real remote."""
+        repo_url = url if isinstance(url, RepoUrl) else parse_repo_url(url)
+        return [
+            ['git', 'clone', '--quiet', mirror_path, repo_url.name],
+            ['git', '-C', repo_url.name, 'remote', 'set-url', 'origin', repo_url.public_git_url],
+        ]
+
+    def evict(self) -> list:
+        """Delete least recently used mirrors until the cache fits in max_bytes. Returns the evicted paths."""
+        mirrors = []
+        for host in _subdirectories(self.cache_dir):
+            for dirpath, dirnames, _ in os.walk(host):
+                for dirname in list(dirnames):
+                    if dirname.endswith(".git"):
+                        mirror_path = os.path.join(dirpath, dirname)
+                        mirrors.append((_marker_time(mirror_path, LAST_USED_MARKER), _directory_size(mirror_path), mirror_path))
+                        dirnames.remove(dirname)
+
+        total_bytes = sum(size for _, size, _ in mirrors)
+        evicted = []
+        for _, size, mirror_path in sorted(mirrors):
+            if total_bytes <= self.max_bytes:
+                break
+            with self._lock_for(mirror_path):
+                force_rmtree(mirror_path)
+            total_bytes -= size
+            evicted.append(mirror_path)
+            logging.info(f"Evicted mirror {mirror_path} ({size / 1024 ** 2:.1f} MB)")
+        return evicted
+
+
+def _touch(mirror_path: str, marker: str) -> None:
+    with open(os.path.join(mirror_path, marker), "a"):
+        pass
+    os.utime(os.path.join(mirror_path, marker))
+
+
+def _marker_time(mirror_path: str, marker: str) -> float:
+    try:
+        return os.path.getmtime(os.path.join(mirror_path, marker))
+    except FileNotFoundError:
+        return 0.0
+
+
+def _subdirectories(path: str) -> list:
+    return [entry.path for entry in os.scandir(path) if entry.is_dir()]
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except FileNotFoundError:
+                pass
+    return total
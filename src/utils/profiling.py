@@ -0,0 +1,102 @@
+import io
+import os
+import atexit
+import pstats
+import logging
+import cProfile
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_TOP_N = 20
+REPORT_FILE_NAME = "profile_report.txt"
+
+_lock = threading.Lock()
+_phase_stats = {}
+_active = threading.local()
+_report_registered = False
+
+
+def profiling_dir() -> Optional[str]:
+    """Directory profiles are written to, or None when profiling is off (PROFILE_DIR is unset)."""
+    return os.environ.get("PROFILE_DIR") or None
+
+
+def enable_profiling(output_dir: str = DEFAULT_PROFILE_DIR) -> None:
+    # Set in the environment so that worker threads and anything that reads PROFILE_DIR later agree.
+    os.environ["PROFILE_DIR"] = output_dir
+
+
+@contextmanager
+def profile_phase(phase: str):
+    """
+    Profile the enclosed block with cProfile when profiling is enabled; a no-op otherwise.
+
+    Every run of a phase is merged into <PROFILE_DIR>/<phase>.prof, which can be opened with pstats or
+    snakeviz, and a top-N hotspot report for all phases is written when the process exits. A phase
+    entered while another is already being profiled on the same thread is counted in the outer one.
+
+    Up to Python 3.11 each thread can run its own profiler, so phases on worker threads are profiled
+    alongside the phase that started them. From 3.12 cProfile is built on sys.monitoring, which allows
+    only one active profiler per process. A phase that starts while another thread is profiling then
+    runs unprofiled rather than failing.
+    """
+    output_dir = profiling_dir()
+    if not output_dir or getattr(_active, "phase", None):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        logging.debug(f"Not profiling {phase}: {e}")
+        profiler = None
+    if profiler is None:
+        yield
+        return
+
+    _active.phase = phase
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _active.phase = None
+        _record(phase, profiler, output_dir)
+
+
+def _record(phase: str, profiler: cProfile.Profile, output_dir: str) -> None:
+    global _report_registered
+    with _lock:
+        stats = _phase_stats.get(phase)
+        if stats is None:
+            stats = _phase_stats[phase] = pstats.Stats(profiler)
+        else:
+            stats.add(profiler)
+        os.makedirs(output_dir, exist_ok=True)
+        stats.dump_stats(os.path.join(output_dir, f"{phase}.prof"))
+        if not _report_registered:
+            atexit.register(write_profile_report)
+            _report_registered = True
+
+
+def write_profile_report(output_dir: Optional[str] = None, top_n: Optional[int] = None) -> Optional[str]:
+    """Write the top_n functions by cumulative time for every profiled phase to a text report."""
+    output_dir = output_dir or profiling_dir()
+    if not output_dir or not _phase_stats:
+        return None
+    top_n = top_n or int(os.environ.get("PROFILE_TOP_N", DEFAULT_TOP_N))
+
+    report = io.StringIO()
+    with _lock:
+        for phase, stats in sorted(_phase_stats.items()):
+            report.write(f"==== {phase}: {stats.total_calls} calls in {stats.total_tt:.3f}s ====\n")
+            stats.stream = report
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+
+    report_path = os.path.join(output_dir, REPORT_FILE_NAME)
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(report.getvalue())
+    logging.info(f"Profiles for {len(_phase_stats)} phases written to {os.path.abspath(output_dir)}, hotspots in {report_path}")
+    return report_path
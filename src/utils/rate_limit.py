@@ -0,0 +1,79 @@
+import time
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Optional
+import requests
+from utils.metrics import metrics, RATE_LIMIT_SLEEPS, RATE_LIMIT_SLEEP_SECONDS
+
+# Used when a provider answers 429 without saying how long to wait.
+DEFAULT_RETRY_AFTER = 60.0
+
+
+def _header(response: requests.Response, *names: str) -> Optional[str]:
+    for name in names:
+        value = response.headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def rate_limit_delay(response: requests.Response) -> Optional[float]:
+    """
+    Seconds to wait before retrying a rate-limited response, or None if the response is not rate-limited.
+
+    Understands Retry-After as well as the GitHub (X-RateLimit-*) and GitLab (RateLimit-*) reset headers.
+    """
+    if response.status_code not in (403, 429):
+        return None
+
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+
+    if _header(response, "X-RateLimit-Remaining", "RateLimit-Remaining") == "0":
+        reset = _header(response, "X-RateLimit-Reset", "RateLimit-Reset")
+        return max(float(reset) - time.time(), 0.0) if reset else DEFAULT_RETRY_AFTER
+
+    return DEFAULT_RETRY_AFTER if response.status_code == 429 else None
+
+
+class RateLimitPolicy:
+    """
+    Pacing and back-off shared by every request to one SCM host.
+
+    min_interval spaces out request starts; a rate-limited response pauses the whole host until its
+    reset time, as long as that is no more than max_sleep seconds away.
+    """
+
+    def __init__(self, min_interval: float = 0.0, max_sleep: float = 900.0, max_retries: int = 3) -> None:
+        self.min_interval = min_interval
+        self.max_sleep = max_sleep
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._next_request_at = 0.0
+        self._paused_until = 0.0
+
+    def wait(self) -> None:
+        """Block until the next request to this host may start."""
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_request_at, self._paused_until)
+            self._next_request_at = start_at + self.min_interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def should_retry(self, response: requests.Response, attempt: int) -> bool:
+        """Pause the host and return True if a rate-limited response is worth retrying."""
+        delay = rate_limit_delay(response)
+        if delay is None or attempt >= self.max_retries or delay > self.max_sleep:
+            return False
+        logging.warning(f"Rate limited by {response.url}, pausing requests for {delay:.0f}s")
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        metrics.inc(RATE_LIMIT_SLEEPS)
+        metrics.inc(RATE_LIMIT_SLEEP_SECONDS, amount=delay)
+        return True
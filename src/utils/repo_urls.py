@@ -0,0 +1,104 @@
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Iterator, NamedTuple
+
+GITHUB_HOSTS = {"github.com"}
+GITLAB_HOSTS = {"gitlab.com"}
+BITBUCKET_HOSTS = {"bitbucket.org"}
+
+# Accepts https://host[:port]/owner/.../name[.git][/] as well as scp-like git@host:owner/name.git.
+REPO_URL_PATTERN = re.compile(
+    r'^(?:[a-z][\w+.-]*://)?(?:[^@/\s]+@)?(?P<host>[^/:\s]+)(?::\d+(?=/))?[/:](?P<path>[^\s?#/][^\s?#]*?)/*$',
+    re.IGNORECASE
+)
+
+
+class RepoUrl(NamedTuple):
+    """A repository URL parsed once into the parts the rest of the pipeline needs."""
+    url: str
+    host: str
+    owner: str
+    name: str
+    scm: str
+
+    @property
+    def key(self) -> tuple:
+        """Normalised identity used for de-duplication: case, trailing slashes and .git are ignored."""
+        return self.host, self.owner.lower(), self.name.lower()
+
+    @property
+    def public_git_url(self) -> str:
+        url = self.url.rstrip("/")
+        return url if url.endswith(".git") else f"{url}.git"
+
+    @property
+    def public_url(self) -> str:
+        return self.public_git_url[:-len(".git")]
+
+
+def _env_hosts(name: str) -> set:
+    return {host.strip().lower() for host in os.environ.get(name, "").split(",") if host.strip()}
+
+
+@lru_cache(maxsize=None)
+def scm_for_host(host: str, default_scm: str = "github") -> str:
+    """Map a host to its SCM type, including self-hosted hosts listed in GITHUB_HOSTS/GITLAB_HOSTS/BITBUCKET_HOSTS."""
+    host = host.lower()
+    for scm, known_hosts in (("github", GITHUB_HOSTS), ("gitlab", GITLAB_HOSTS), ("bitbucket", BITBUCKET_HOSTS)):
+        if host in known_hosts or host in _env_hosts(f"{scm.upper()}_HOSTS"):
+            return scm
+    return default_scm
+
+
+def parse_repo_url(url: str, default_scm: str = "github") -> RepoUrl:
+    """Parse a repository URL with a single regex match. Raises ValueError if it isn't one."""
+    url = url.strip()
+    match = REPO_URL_PATTERN.match(url)
+    if not match:
+        raise ValueError(f"Not a repository URL: {url}")
+    owner, _, name = match.group("path").rpartition("/")
+    if name.endswith(".git"):
+        name = name[:-len(".git")]
+    if not owner or not name:
+        raise ValueError(f"Repository URL has no owner or name: {url}")
+    host = match.group("host").lower()
+    return RepoUrl(url=url, host=host, owner=owner, name=name, scm=scm_for_host(host, default_scm))
+
+
+def iter_repo_urls(file_path: str, default_scm: str = "github") -> Iterator[RepoUrl]:
+    """
+    Stream unique repository URLs from a text file, one per line.
+
+    Lines are read lazily and parsed once. Blank lines and lines starting with # are skipped, lines that
+    aren't repository URLs are logged and skipped, and duplicates are dropped by their normalised key.
+    """
+    seen = set()
+    with open(os.path.abspath(file_path), "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                repo_url = parse_repo_url(line, default_scm)
+            except ValueError as e:
+                logging.warning(f"Skipping line {line_number} of {file_path}: {e}")
+                continue
+            if repo_url.key in seen:
+                continue
+            seen.add(repo_url.key)
+            yield repo_url
+
+
+def load_repo_urls(file_path: str, default_scm: str = "github") -> list:
+    """Read all unique repository URLs from a text file, sorted by repository name."""
+    try:
+        repo_urls = sorted(iter_repo_urls(file_path, default_scm), key=lambda repo_url: repo_url.name.lower())
+    except FileNotFoundError:
+        logging.error(f"File not found: {file_path}")
+        raise
+    if not repo_urls:
+        logging.error("No data found in the file. Ensure the file has data, exists, or the path is correct.")
+        raise ValueError("File is empty")
+    return repo_urls
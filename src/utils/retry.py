@@ -0,0 +1,141 @@
+import time
+import heapq
+import random
+import logging
+import threading
+from itertools import count
+from typing import Any, Optional
+import requests
+from utils.metrics import metrics, CIRCUIT_BREAKER_OPENED
+from utils.rate_limit import rate_limit_delay
+
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BASE_DELAY = 2.0
+DEFAULT_MAX_DELAY = 120.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 60.0
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of sending a request to a host whose circuit breaker is open."""
+
+    def __init__(self, host: str, retry_after: float) -> None:
+        super().__init__(f"Circuit breaker for {host} is open, not sending requests for {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a host that keeps failing.
+
+    After failure_threshold consecutive server errors or connection failures the circuit opens and
+    every request fails fast with CircuitOpen. Once reset_timeout has passed a single probe request is
+    let through: success closes the circuit again, failure keeps it open for another reset_timeout.
+    """
+
+    def __init__(self, host: str, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT) -> None:
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def before_request(self) -> None:
+        """Raise CircuitOpen unless a request to this host may be sent now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._probe_in_flight:
+                raise CircuitOpen(self.host, remaining if remaining > 0 else self.reset_timeout)
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logging.info(f"Circuit breaker for {self.host} closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            reopening = self._probe_in_flight
+            self._probe_in_flight = False
+            if reopening or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                if not reopening:
+                    logging.warning(f"Circuit breaker for {self.host} opened after {self._failures} consecutive failures")
+                    metrics.inc(CIRCUIT_BREAKER_OPENED, {"host": self.host})
+
+
+def is_server_failure(response: Optional[requests.Response]) -> bool:
+    """True for outcomes that count against a host's circuit breaker: no response at all, or a 5xx."""
+    return response is None or response.status_code >= 500
+
+
+def is_transient(error: BaseException) -> bool:
+    """True if a failed fetch is worth retrying later, rather than failing the same way every time."""
+    if isinstance(error, (CircuitOpen, requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in (408, 500, 502, 503, 504) or rate_limit_delay(error.response) is not None
+    return False
+
+
+def backoff_delay(attempt: int, base_delay: float = DEFAULT_BASE_DELAY, max_delay: float = DEFAULT_MAX_DELAY) -> float:
+    """Exponential backoff with full jitter: a random delay up to base_delay * 2**attempt, capped at max_delay."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class RetryQueue:
+    """
+    Failed work deferred for a later attempt, ordered by when it may be retried.
+
+    Items that have been tried max_retries times are rejected by defer and should be treated as failed
+    for good.
+    """
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._heap = []
+        self._sequence = count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def defer(self, item: Any, attempt: int, error: BaseException) -> bool:
+        """
+        Schedule attempt number `attempt` (1 for the first retry) of item. Returns False if it is out of retries.
+
+        The delay is never shorter than the time a CircuitOpen error says the host's circuit will stay open.
+        """
+        if attempt > self.max_retries:
+            return False
+        delay = backoff_delay(attempt - 1, self.base_delay, self.max_delay)
+        if isinstance(error, CircuitOpen):
+            delay = max(delay, error.retry_after)
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), item, attempt))
+        return True
+
+    def pop_ready(self) -> list:
+        """Wait until at least one item is due, then remove and return every due (item, attempt) pair."""
+        if not self._heap:
+            return []
+        delay = self._heap[0][0] - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        now = time.monotonic()
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, item, attempt = heapq.heappop(self._heap)
+            ready.append((item, attempt))
+        return ready
@@ -0,0 +1,235 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import quote
+import requests
+from requests.adapters import HTTPAdapter
+from utils.git_utils import GithubAPIHandler, scm_request, is_bot_commit
+from utils.rate_limit import RateLimitPolicy
+from utils.retry import CircuitBreaker, DEFAULT_FAILURE_THRESHOLD, DEFAULT_RESET_TIMEOUT
+from utils.credential_pool import CredentialPool
+from utils.repo_urls import RepoUrl, GITHUB_HOSTS, BITBUCKET_HOSTS, scm_for_host
+
+DEFAULT_MAX_CONCURRENCY = {"github": 8, "gitlab": 4, "bitbucket": 4}
+# Workers for commit statistics polls, kept apart from the main fetches so polls aren't queued behind them.
+DEFAULT_STATS_CONCURRENCY = 2
+
+# Bitbucket reports a single lower-case primary language; map the common ones to GitHub's spelling.
+BITBUCKET_LANGUAGE_NAMES = {
+    "javascript": "JavaScript",
+    "typescript": "TypeScript",
+    "php": "PHP",
+    "html/css": "HTML",
+    "c#": "C#",
+    "c++": "C++",
+    "objective-c": "Objective-C",
+    "coffeescript": "CoffeeScript",
+}
+
+
+class ScmProvider:
+    """
+    Base class for an SCM API backend bound to one host.
+
+    Each provider owns its own HTTP connection pool, a thread pool sized to its concurrency cap, a
+    rate limit policy and a circuit breaker, so a slow, throttled or failing host only ever delays its
+    own repositories. Providers with repo stats also get a small stats_executor for utils.commit_stats.
+    """
+    name = None
+    # Whether get_repo_stats is implemented; see utils.commit_stats.
+    supports_repo_stats = False
+
+    def __init__(self, host: str, headers: Optional[dict] = None, max_concurrency: Optional[int] = None,
+                 rate_limit_policy: Optional[RateLimitPolicy] = None) -> None:
+        self.host = host
+        self.headers = headers or {}
+        self.max_concurrency = max_concurrency or _env_int(f"{self.name.upper()}_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY[self.name])
+        self.rate_limit_policy = rate_limit_policy or RateLimitPolicy(
+            min_interval=float(os.environ.get(f"{self.name.upper()}_MIN_REQUEST_INTERVAL", 0))
+        )
+        self.circuit_breaker = CircuitBreaker(
+            host,
+            failure_threshold=_env_int("CIRCUIT_BREAKER_THRESHOLD", DEFAULT_FAILURE_THRESHOLD),
+            reset_timeout=float(os.environ.get("CIRCUIT_BREAKER_RESET_SECONDS", DEFAULT_RESET_TIMEOUT))
+        )
+
+        stats_concurrency = _env_int("COMMIT_STATS_MAX_CONCURRENCY", DEFAULT_STATS_CONCURRENCY) if self.supports_repo_stats else 0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency + stats_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"{self.name}-{host}")
+        self.stats_executor = ThreadPoolExecutor(max_workers=stats_concurrency, thread_name_prefix=f"{self.name}-{host}-stats") \
+            if stats_concurrency else None
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return scm_request(method, url, headers=self.headers, session=self.session,
+                           rate_limit_policy=self.rate_limit_policy, circuit_breaker=self.circuit_breaker, **kwargs)
+
+    def get_language_bytes(self, owner: str, repo_name: str) -> Optional[dict]:
+        """Raw byte counts per language, or None if the provider only reports percentages."""
+        return None
+
+    def get_language_percentages(self, owner: str, repo_name: str, language_bytes: Optional[dict] = None) -> dict:
+        raise NotImplementedError
+
+    def get_last_commit_date(self, owner: str, repo_name: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def get_repo_stats(self, owner: str, repo_name: str, stat: str) -> Optional[list]:
+        """A repository statistic, or None if the provider is still computing it and should be asked again."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        if self.stats_executor:
+            self.stats_executor.shutdown(wait=False)
+        self.session.close()
+
+
+class GithubProvider(ScmProvider):
+    name = "github"
+    supports_repo_stats = True
+
+    def __init__(self, host: str, headers: Optional[dict] = None, credential_pool: Optional[CredentialPool] = None, **kwargs) -> None:
+        super().__init__(host, headers, **kwargs)
+        # GitHub Enterprise serves its API under /api/v3 on the instance host.
+        self.base_url = "https://api.github.com" if host in GITHUB_HOSTS else f"https://{host}/api/v3"
+        self.credential_pool = credential_pool
+
+    def _handler(self, repo_name: str) -> GithubAPIHandler:
+        return GithubAPIHandler(repo_name=repo_name, headers=self.headers, org="use_environment", base_url=self.base_url,
+                                session=self.session, rate_limit_policy=self.rate_limit_policy,
+                                credential_pool=self.credential_pool, circuit_breaker=self.circuit_breaker)
+
+    def get_language_bytes(self, owner: str, repo_name: str) -> Optional[dict]:
+        return self._handler(repo_name).get_github_repo_language_bytes(owner=owner)
+
+    def get_language_percentages(self, owner: str, repo_name: str, language_bytes: Optional[dict] = None) -> dict:
+        handler = self._handler(repo_name)
+        if language_bytes is None:
+            language_bytes = handler.get_github_repo_language_bytes(owner=owner)
+        return handler.language_percentages(language_bytes)
+
+    def get_last_commit_date(self, owner: str, repo_name: str) -> Optional[str]:
+        return self._handler(repo_name).get_last_commit_date(owner=owner)
+
+    def get_repo_stats(self, owner: str, repo_name: str, stat: str) -> Optional[list]:
+        return self._handler(repo_name).get_github_repo_stats(stat, owner=owner)
+
+
+class GitlabProvider(ScmProvider):
+    name = "gitlab"
+
+    def __init__(self, host: str, headers: Optional[dict] = None, **kwargs) -> None:
+        token = os.environ.get("GITLAB_API_KEY")
+        super().__init__(host, headers if headers is not None else ({"PRIVATE-TOKEN": token} if token else {}), **kwargs)
+        self.base_url = f"https://{host}/api/v4"
+
+    def _project_url(self, owner: str, repo_name: str) -> str:
+        # GitLab addresses projects by their URL-encoded full path, which may include subgroups.
+        return f"{self.base_url}/projects/{quote(f'{owner}/{repo_name}', safe='')}"
+
+    def get_language_percentages(self, owner: str, repo_name: str, language_bytes: Optional[dict] = None) -> dict:
+        response = self._request('GET', f"{self._project_url(owner, repo_name)}/languages")
+        return {language: round(percentage, 2) for language, percentage in response.json().items()}
+
+    def get_last_commit_date(self, owner: str, repo_name: str) -> Optional[str]:
+        response = self._request('GET', f"{self._project_url(owner, repo_name)}/repository/commits", params={"per_page": 100})
+        commit_dates = [
+            commit["authored_date"] for commit in response.json()
+            if not is_bot_commit(commit.get("author_name", ""), commit.get("committer_name", ""))
+        ]
+        return max(commit_dates).split("T")[0] if commit_dates else None
+
+
+class BitbucketProvider(ScmProvider):
+    """
+    Bitbucket Cloud. Self-hosted Bitbucket Data Center has a different REST API with no language
+    data, so repositories on hosts added through BITBUCKET_HOSTS fail with a fetch_error.
+    """
+    name = "bitbucket"
+
+    def __init__(self, host: str, headers: Optional[dict] = None, **kwargs) -> None:
+        token = os.environ.get("BITBUCKET_API_KEY")
+        super().__init__(host, headers if headers is not None else ({"Authorization": f"Bearer {token}"} if token else {}), **kwargs)
+        self.base_url = "https://api.bitbucket.org/2.0" if host in BITBUCKET_HOSTS else None
+        if self.base_url is None:
+            logging.warning(f"{host} is not Bitbucket Cloud; its repositories can't be fetched")
+
+    def _repository_url(self, owner: str, repo_name: str) -> str:
+        if self.base_url is None:
+            raise ValueError(f"Bitbucket Data Center ({self.host}) is not supported, only Bitbucket Cloud")
+        return f"{self.base_url}/repositories/{owner}/{repo_name}"
+
+    def get_language_percentages(self, owner: str, repo_name: str, language_bytes: Optional[dict] = None) -> dict:
+        response = self._request('GET', self._repository_url(owner, repo_name))
+        language = response.json().get("language")
+        if not language:
+            return {}
+        return {BITBUCKET_LANGUAGE_NAMES.get(language, language.title()): 100.0}
+
+    def get_last_commit_date(self, owner: str, repo_name: str) -> Optional[str]:
+        response = self._request('GET', f"{self._repository_url(owner, repo_name)}/commits", params={"pagelen": 100})
+        # Bitbucket only exposes the raw author string, so it is checked as both author and committer.
+        commit_dates = [
+            commit["date"] for commit in response.json().get("values", [])
+            if not is_bot_commit(commit.get("author", {}).get("raw", ""), commit.get("author", {}).get("raw", ""))
+        ]
+        return max(commit_dates).split("T")[0] if commit_dates else None
+
+
+PROVIDER_CLASSES = {provider.name: provider for provider in (GithubProvider, GitlabProvider, BitbucketProvider)}
+
+
+class ProviderRegistry:
+    """Creates one provider per host on first use and maps repository URLs to them."""
+
+    def __init__(self, default_scm: str = "github", github_headers: Optional[dict] = None,
+                 credential_pool: Optional[CredentialPool] = None) -> None:
+        self.default_scm = default_scm
+        self.github_headers = github_headers
+        self.credential_pool = credential_pool
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host: str) -> ScmProvider:
+        host = host.lower()
+        with self._lock:
+            provider = self._providers.get(host)
+            if provider is None:
+                scm = scm_for_host(host, self.default_scm)
+                if scm == "github":
+                    # Pooled tokens belong to github.com; Enterprise hosts use their own tokens.
+                    if host in GITHUB_HOSTS:
+                        pool = self.credential_pool
+                    else:
+                        pool = CredentialPool.from_env("GITHUB_ENTERPRISE_API_KEYS", "GITHUB_ENTERPRISE_API_KEY")
+                    provider = GithubProvider(host, self.github_headers, credential_pool=pool)
+                else:
+                    provider = PROVIDER_CLASSES[scm](host)
+                self._providers[host] = provider
+                logging.info(f"Using {scm} provider for {host} with {provider.max_concurrency} concurrent requests")
+            return provider
+
+    def for_url(self, repo_url: RepoUrl) -> ScmProvider:
+        return self.for_host(repo_url.host)
+
+    def providers(self) -> list:
+        with self._lock:
+            return list(self._providers.values())
+
+    def close(self) -> None:
+        """Shut down every provider's thread pool and session. Providers are created again if used later."""
+        with self._lock:
+            providers = list(self._providers.values())
+            self._providers.clear()
+        for provider in providers:
+            provider.close()
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
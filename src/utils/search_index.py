@@ -0,0 +1,121 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+
+# How much a trigram counts towards a match depending on the field it came from.
+REPO_FIELD_WEIGHTS = {"name": 1.0, "languages": 0.8, "url": 0.5}
+# Queries must share at least this fraction of their (weighted) trigrams with a repo to match it.
+DEFAULT_MIN_SCORE = 0.4
+# Added to the score of repos whose name contains the query verbatim, so exact hits rank first.
+SUBSTRING_BONUS = 1.0
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9#+]+")
+
+
+@lru_cache(maxsize=65536)
+def _token_trigrams(token: str) -> frozenset:
+    # Words such as language names and hosts repeat across thousands of repos, so this is cached.
+    padded = f"  {token} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def trigrams(text: str) -> set:
+    """Trigrams of every word in text, with each word padded so that short words and prefixes still match."""
+    grams = set()
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        grams.update(_token_trigrams(token))
+    return grams
+
+
+def repo_search_fields(repo_name: str, repo_data: dict) -> list:
+    """The (text, weight) pairs a repository is indexed under: its name, languages and URL."""
+    return [
+        (repo_name, REPO_FIELD_WEIGHTS["name"]),
+        (" ".join(repo_data.get("languages") or ()), REPO_FIELD_WEIGHTS["languages"]),
+        (repo_data.get("public_url") or repo_data.get("public_git_url") or "", REPO_FIELD_WEIGHTS["url"]),
+    ]
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigrams to the keys whose text contains them, for typo tolerant search.
+
+    Documents can be added, replaced and removed one at a time, so the index can be built up while data
+    is still loading. A search only visits the posting lists of the query's own trigrams.
+    """
+
+    def __init__(self) -> None:
+        self._postings = defaultdict(dict)
+        self._document_grams = {}
+
+    def __len__(self) -> int:
+        return len(self._document_grams)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._document_grams
+
+    def keys(self):
+        return self._document_grams.keys()
+
+    def add(self, key: str, fields: Iterable[tuple]) -> None:
+        """Index key under (text, weight) fields, replacing whatever it was indexed under before."""
+        grams = {}
+        # Lowest weight first, so each trigram ends up with the weight of the best field it appears in.
+        for text, weight in sorted(fields, key=lambda field: field[1]):
+            grams.update(dict.fromkeys(trigrams(text), weight))
+        if self._document_grams.get(key) == grams:
+            return
+        self.remove(key)
+        for gram, weight in grams.items():
+            self._postings[gram][key] = weight
+        self._document_grams[key] = grams
+
+    def remove(self, key: str) -> None:
+        for gram in self._document_grams.pop(key, {}):
+            posting = self._postings[gram]
+            posting.pop(key, None)
+            if not posting:
+                del self._postings[gram]
+
+    def search(self, query: str, limit: Optional[int] = None, min_score: float = DEFAULT_MIN_SCORE) -> list:
+        """
+        Keys matching query, best first, as (key, score) pairs.
+
+        The score is the weighted fraction of the query's trigrams found in the key's text, plus
+        SUBSTRING_BONUS if the key contains the query as typed.
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        scores = defaultdict(float)
+        for gram in query_grams:
+            for key, weight in self._postings.get(gram, {}).items():
+                scores[key] += weight
+
+        needle = query.strip().lower()
+        results = []
+        for key, total in scores.items():
+            score = total / len(query_grams)
+            if score < min_score:
+                continue
+            if needle in key.lower():
+                score += SUBSTRING_BONUS
+            results.append((key, round(score, 4)))
+        results.sort(key=lambda result: (-result[1], len(result[0]), result[0]))
+        return results[:limit] if limit else results
+
+    def add_repos(self, repos: Iterable[tuple], batch_size: int = 500) -> Iterator[int]:
+        """
+        Index (repo_name, repo_data) pairs, yielding the number indexed after every batch_size repos.
+
+        Callers on a UI thread can resume the generator from their event loop to index a large fleet
+        without blocking it.
+        """
+        indexed = 0
+        for repo_name, repo_data in repos:
+            self.add(repo_name, repo_search_fields(repo_name, repo_data))
+            indexed += 1
+            if indexed % batch_size == 0:
+                yield indexed
+        yield indexed
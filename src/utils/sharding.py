@@ -0,0 +1,191 @@
+import os
+import json
+import glob
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+from utils.utils import load_json_from_file, write_json_to_file
+from utils.repo_urls import RepoUrl, iter_repo_urls
+from utils.metrics import export_metrics
+from utils.profiling import profile_phase
+from utils.snapshot_store import record_snapshot
+from utils.generate_data import load_previous_data
+from models.Repo import Repo
+from models.RepositoryDataFetcher import RepositoryFetcher, carry_forward
+
+DEFAULT_SHARD_DIR = "shards"
+# A shard's checkpoint log is flushed after this many repos, so a restarted worker only redoes the rest.
+DEFAULT_CHECKPOINT_EVERY = 100
+SHARD_FILE_PATTERN = "shard-*-of-*.json"
+CHECKPOINT_FILE_PATTERN = "shard-*-of-*.jsonl"
+
+
+def parse_shard_spec(spec: str) -> tuple:
+    """Parse "I/N" (0 <= I < N) into (I, N). Raises ValueError otherwise."""
+    index, _, count = spec.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Shard must look like I/N, got {spec!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be between 0 and {count - 1}, got {spec!r}")
+    return index, count
+
+
+def shard_for(repo_url: RepoUrl, shard_count: int) -> int:
+    """
+    Stable shard number of a repo.
+
+    Hashes the normalised RepoUrl.key with blake2b rather than using hash(), which is randomised per
+    process, so every worker on every host agrees on the partition regardless of list order.
+    """
+    digest = hashlib.blake2b("/".join(repo_url.key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+def iter_shard_urls(repo_urls: Iterable[RepoUrl], shard_index: int, shard_count: int) -> Iterator[RepoUrl]:
+    return (repo_url for repo_url in repo_urls if shard_for(repo_url, shard_count) == shard_index)
+
+
+def shard_path(shard_dir: str, shard_index: int, shard_count: int) -> str:
+    return os.path.join(shard_dir, f"shard-{shard_index}-of-{shard_count}.json")
+
+
+def checkpoint_path(shard_dir: str, shard_index: int, shard_count: int) -> str:
+    return os.path.join(shard_dir, f"shard-{shard_index}-of-{shard_count}.jsonl")
+
+
+def read_checkpoint(path: str) -> dict:
+    """
+    RepoUrl.key -> (repo_name, repo_data) for every repo in a checkpoint log; empty if there is none.
+
+    The log is append-only with one JSON object per line. A line cut short by an interrupted write is
+    skipped, and a repo fetched more than once keeps its last line.
+    """
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[tuple(entry["key"])] = (entry["name"], entry["repo"])
+    return entries
+
+
+def _end_unfinished_line(path: str) -> None:
+    """Terminate a last line that an interrupted write left unfinished, so new lines are appended cleanly."""
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def generate_shard(shard_index: int, shard_count: int, shard_dir: Optional[str] = None,
+                   fetcher: Optional[RepositoryFetcher] = None, headers: Optional[dict] = None) -> str:
+    """
+    Fetch this worker's partition of GIT_REPOS_LIST_PATH into its own shard file and return its path.
+
+    Each fetched repo is appended to a checkpoint log (shard-I-of-N.jsonl), which is flushed every
+    SHARD_CHECKPOINT_EVERY repos, so checkpointing costs the same for every repo however large the
+    shard is. If a previous run of the same shard did not finish, the repos in its log that were
+    fetched successfully are kept and only the rest are fetched. Once the shard is complete it is
+    written as shard-I-of-N.json and the log is removed, so the next run refreshes it from scratch.
+    """
+    with profile_phase("generate_shard"):
+        shard_dir = shard_dir or os.environ.get("SHARD_DIR", DEFAULT_SHARD_DIR)
+        os.makedirs(shard_dir, exist_ok=True)
+        path = shard_path(shard_dir, shard_index, shard_count)
+        log_path = checkpoint_path(shard_dir, shard_index, shard_count)
+        checkpoint_every = int(os.environ.get("SHARD_CHECKPOINT_EVERY", DEFAULT_CHECKPOINT_EVERY))
+
+        # Keyed by RepoUrl.key rather than name, since repos of different owners may share a name.
+        done = {key: entry for key, entry in read_checkpoint(log_path).items() if "fetch_error" not in entry[1]}
+        if done:
+            logging.info(f"Resuming shard {shard_index}/{shard_count} with {len(done)} repos already fetched")
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        urls = (
+            repo_url for repo_url in iter_shard_urls(iter_repo_urls(os.environ.get("GIT_REPOS_LIST_PATH")), shard_index, shard_count)
+            if repo_url.key not in done
+        )
+
+        repos = dict(done.values())
+        fetcher = fetcher or RepositoryFetcher(scmType="github", headers=headers)
+        _end_unfinished_line(log_path)
+        with open(log_path, "a", encoding="utf-8") as log:
+            for fetched, (repo_url, repo) in enumerate(fetcher.fetch_with_urls(urls), 1):
+                repo_data = repo.to_dict()
+                repos[repo.name] = repo_data
+                log.write(json.dumps({"key": list(repo_url.key), "name": repo.name, "repo": repo_data}) + "\n")
+                if fetched % checkpoint_every == 0:
+                    log.flush()
+
+        write_json_to_file(file_path=path, json_obj={
+            "shard": f"{shard_index}/{shard_count}",
+            "started_at": started_at,
+            "repos": dict(sorted(repos.items())),
+        })
+        os.remove(log_path)
+        logging.info(f"Shard {shard_index}/{shard_count} complete with {len(repos)} repos: {path}")
+        metrics_dir = os.environ.get("METRICS_OUTPUT_DIR")
+        if metrics_dir:
+            export_metrics(os.path.join(metrics_dir, f"shard-{shard_index}-of-{shard_count}"))
+        return path
+
+
+def _is_newer(candidate: dict, current: dict) -> bool:
+    """Conflict rule: a successful fetch beats a failed one, then the later fetched_at wins."""
+    candidate_failed, current_failed = "fetch_error" in candidate, "fetch_error" in current
+    if candidate_failed != current_failed:
+        return current_failed
+    return (candidate.get("fetched_at") or "") > (current.get("fetched_at") or "")
+
+
+def _iter_shard_repos(shard_paths: list, checkpoint_paths: list) -> Iterator[tuple]:
+    """(repo_name, repo_data) for every repo in the finished shards, then in the unfinished runs' logs."""
+    for path in shard_paths:
+        yield from load_json_from_file(path).get("repos", {}).items()
+    for path in checkpoint_paths:
+        logging.warning(f"{path} is from a shard run that did not finish; merging the repos it has")
+        yield from read_checkpoint(path).values()
+
+
+def merge_shards(shard_dir: str, output_path: Optional[str] = None) -> dict:
+    """
+    Combine every shard file in shard_dir into the canonical DATA_SAVE_PATH output.
+
+    A repo found in several shards (e.g. after the shard count changed between runs) is resolved with
+    _is_newer. The checkpoint logs of unfinished runs are merged too, with a warning. Repos that failed in
+    every shard keep their entry from the existing output, see carry_forward. Returns the merged data.
+    """
+    output_path = output_path or os.environ.get("DATA_SAVE_PATH")
+    shard_paths = sorted(glob.glob(os.path.join(shard_dir, SHARD_FILE_PATTERN)))
+    checkpoint_paths = sorted(glob.glob(os.path.join(shard_dir, CHECKPOINT_FILE_PATTERN)))
+    if not shard_paths and not checkpoint_paths:
+        raise FileNotFoundError(f"No shard files found in {shard_dir}")
+
+    merged = {}
+    conflicts = 0
+    for name, data in _iter_shard_repos(shard_paths, checkpoint_paths):
+        current = merged.get(name)
+        if current is not None:
+            conflicts += 1
+            if not _is_newer(data, current):
+                continue
+        merged[name] = data
+
+    previous_data = load_previous_data(output_path)
+    for name, data in merged.items():
+        if "fetch_error" in data and name in previous_data:
+            merged[name] = carry_forward(Repo.from_dict(data), previous_data[name]).to_dict()
+
+    json_data = dict(sorted(merged.items()))
+    write_json_to_file(json_obj=json_data, file_path=output_path)
+    record_snapshot(json_data)
+    logging.info(f"Merged {len(shard_paths) + len(checkpoint_paths)} shard files into {output_path}: {len(json_data)} repos, {conflicts} conflicts resolved")
+    return json_data
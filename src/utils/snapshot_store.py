@@ -0,0 +1,195 @@
+import os
+import json
+import zlib
+import logging
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone, date
+from typing import Iterator, Optional
+
+SNAPSHOT_DATA_FILE = "snapshots.bin"
+SNAPSHOT_INDEX_FILE = "index.jsonl"
+DEFAULT_KEYFRAME_INTERVAL = 30
+DEFAULT_STALE_AFTER_DAYS = 180
+# Keys that change on every fetch without the repo itself changing; kept out of the history so deltas stay small.
+# fetch_error is one of them: a repo that failed keeps its previous data, which is what the history should show.
+VOLATILE_KEYS = ("fetched_at", "fetch_error")
+
+
+class SnapshotStore:
+    """
+    Append-only history of generated repository data.
+
+    Each snapshot is either a keyframe (the full repo dict) or a delta holding only the repos that
+    changed or were removed since the previous snapshot. Payloads are zlib-compressed JSON appended to
+    snapshots.bin; index.jsonl records when each snapshot was taken and where its payload lives, so
+    a query only has to decode from the nearest keyframe before the range it asks about.
+    """
+
+    def __init__(self, directory: str, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, SNAPSHOT_DATA_FILE)
+        self.index_path = os.path.join(directory, SNAPSHOT_INDEX_FILE)
+        self.keyframe_interval = keyframe_interval
+        self.index = self._load_index()
+
+    def _load_index(self) -> list:
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, "r", encoding="utf-8") as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    def _read_payload(self, entry: dict) -> dict:
+        with open(self.data_path, "rb") as file:
+            file.seek(entry["offset"])
+            return json.loads(zlib.decompress(file.read(entry["length"])))
+
+    def _write(self, payload: dict, keyframe: bool, taken_at: datetime) -> dict:
+        blob = zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        with open(self.data_path, "ab") as file:
+            offset = file.tell()
+            file.write(blob)
+        entry = {
+            "taken_at": _to_utc(taken_at).isoformat(timespec="seconds"),
+            "offset": offset,
+            "length": len(blob),
+            "keyframe": keyframe,
+            "changed": len(payload.get("repos", payload.get("changed", {}))),
+            "removed": len(payload.get("removed", [])),
+        }
+        with open(self.index_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(entry) + "\n")
+        self.index.append(entry)
+        return entry
+
+    def _snapshots_since_keyframe(self) -> int:
+        for distance, entry in enumerate(reversed(self.index)):
+            if entry["keyframe"]:
+                return distance
+        return len(self.index)
+
+    def append(self, repo_data: dict, taken_at: Optional[datetime] = None) -> dict:
+        """
+        Record a full run's output, storing only the differences from the latest snapshot
+        unless a keyframe is due.
+        """
+        taken_at = taken_at or datetime.now(timezone.utc)
+        repo_data = _without_volatile_keys(repo_data)
+        if not self.index or self._snapshots_since_keyframe() + 1 >= self.keyframe_interval:
+            entry = self._write({"repos": repo_data}, keyframe=True, taken_at=taken_at)
+        else:
+            previous = self.state_at()
+            changed = {name: data for name, data in repo_data.items() if previous.get(name) != data}
+            removed = [name for name in previous if name not in repo_data]
+            entry = self._write({"changed": changed, "removed": removed}, keyframe=False, taken_at=taken_at)
+        logging.info(f"Recorded {'keyframe' if entry['keyframe'] else 'delta'} snapshot with {entry['changed']} changed repos")
+        return entry
+
+    def append_changes(self, changed: dict, removed: tuple = (), taken_at: Optional[datetime] = None) -> dict:
+        """
+        Record a delta for a handful of repos without diffing the whole dataset.
+
+        Raises ValueError on an empty store, since the delta would be read as the whole fleet; record the
+        first snapshot with append.
+        """
+        if not self.index:
+            raise ValueError("The snapshot store is empty; the first snapshot must be a full one.")
+        changed = _without_volatile_keys(changed)
+        return self._write({"changed": changed, "removed": list(removed)}, keyframe=False,
+                           taken_at=taken_at or datetime.now(timezone.utc))
+
+    def _position_at(self, when: Optional[datetime]) -> int:
+        """Index of the last snapshot taken at or before when (-1 if none)."""
+        if when is None:
+            return len(self.index) - 1
+        timestamps = [entry["taken_at"] for entry in self.index]
+        return bisect_right(timestamps, _to_utc(when).isoformat(timespec="seconds")) - 1
+
+    def _keyframe_before(self, position: int) -> int:
+        while position > 0 and not self.index[position]["keyframe"]:
+            position -= 1
+        return position
+
+    def iter_states(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Iterator[tuple]:
+        """
+        Yield (taken_at, state) for every snapshot in [since, until], plus the state as of since.
+
+        The same state dict is mutated between yields; copy it if it needs to outlive the iteration.
+        """
+        end = self._position_at(until)
+        if end < 0:
+            return
+        start = max(self._position_at(since), 0) if since else 0
+        state = {}
+        for position in range(self._keyframe_before(start), end + 1):
+            entry = self.index[position]
+            payload = self._read_payload(entry)
+            if entry["keyframe"]:
+                state = payload["repos"]
+            else:
+                state.update(payload["changed"])
+                for name in payload["removed"]:
+                    state.pop(name, None)
+            if position >= start:
+                yield datetime.fromisoformat(entry["taken_at"]), state
+
+    def state_at(self, when: Optional[datetime] = None) -> dict:
+        """Repository data as it was at the given time (latest if omitted)."""
+        state = {}
+        if when is None:
+            when = datetime.fromisoformat(self.index[-1]["taken_at"]) if self.index else None
+        for _, state in self.iter_states(since=when, until=when):
+            pass
+        return state
+
+    def language_share_history(self, repo_name: str, days: int = 90, now: Optional[datetime] = None) -> list:
+        """Return [(taken_at, languages)] for one repo over the last `days` days."""
+        now = now or datetime.now(timezone.utc)
+        history = []
+        for taken_at, state in self.iter_states(since=now - timedelta(days=days), until=now):
+            repo_data = state.get(repo_name)
+            if repo_data is not None:
+                history.append((taken_at, dict(repo_data.get("languages", {}))))
+        return history
+
+    def repos_went_stale(self, since: datetime, stale_after_days: int = DEFAULT_STALE_AFTER_DAYS) -> list:
+        """
+        Names of repos that were active at `since` but are stale in the latest snapshot.
+
+        A repo is stale when its last commit is more than stale_after_days older than the snapshot it is in.
+        """
+        if not self.index:
+            return []
+        before = self.state_at(since)
+        before_date = _to_utc(since).date()
+        latest_date = datetime.fromisoformat(self.index[-1]["taken_at"]).date()
+        latest = self.state_at()
+        return sorted(
+            name for name, repo_data in latest.items()
+            if _is_stale(repo_data, latest_date, stale_after_days)
+            and name in before and not _is_stale(before[name], before_date, stale_after_days)
+        )
+
+
+def _without_volatile_keys(repo_data: dict) -> dict:
+    return {name: {key: value for key, value in data.items() if key not in VOLATILE_KEYS} for name, data in repo_data.items()}
+
+
+def _to_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _is_stale(repo_data: dict, as_of: date, stale_after_days: int) -> bool:
+    last_commit_date = repo_data.get("last_commit_date")
+    if not last_commit_date:
+        return False
+    return (as_of - date.fromisoformat(last_commit_date[:10])).days > stale_after_days
+
+
+def record_snapshot(repo_data: dict) -> None:
+    """Append repo_data to the snapshot store in SNAPSHOT_DIR, if one is configured."""
+    snapshot_dir = os.environ.get("SNAPSHOT_DIR")
+    if not snapshot_dir:
+        return
+    SnapshotStore(snapshot_dir).append(repo_data)
@@ -3,6 +3,7 @@ import shutil, os, stat, re, json, subprocess
 from typing import Optional, Any
 import logging
 from pathlib import Path
+from utils.metrics import metrics, LOC_COUNT_DURATION
 
 load_dotenv()
 
@@ -122,10 +123,12 @@ def load_json_from_file(file_path: str) -> Any:
         raise
 
 def write_json_to_file(file_path: str, json_obj: dict) -> None:
-    """Saves a JSON object to a file."""
+    """Saves a JSON object to a file, via a temporary file so readers never see a partial write."""
     try:
-        with open(file_path, "w+", encoding="utf-8") as file:
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
             json.dump(json_obj, file, indent=4)
+        os.replace(temp_path, file_path)
         logging.info(f"JSON successfully saved to {file_path}")
     except Exception as e:
         logging.error(f"Error saving JSON: {e}")
@@ -278,8 +281,9 @@ def run_scc_on_directory(target_directory: str) -> dict:
         raise FileNotFoundError(validation_message)
 
     try:
-        result = subprocess.run([scc_path, os.path.abspath(os.path.normpath(target_directory))],
-                                capture_output=True, text=True, encoding='utf-8')
+        with metrics.timer(LOC_COUNT_DURATION):
+            result = subprocess.run([scc_path, os.path.abspath(os.path.normpath(target_directory))],
+                                    capture_output=True, text=True, encoding='utf-8')
 
         if result.returncode == 0:
             return parse_scc_output(result.stdout)
@@ -0,0 +1,294 @@
+import os
+import hmac
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+import requests
+from utils.utils import load_json_from_file, write_json_to_file
+from utils.metrics import metrics, WEBHOOK_EVENTS
+from utils.retry import is_transient, backoff_delay
+from utils.commit_stats import REPO_STAT_FIELDS
+from utils.snapshot_store import SnapshotStore
+
+DEFAULT_WEBHOOK_PORT = 8765
+WEBHOOK_PATH = "/webhook"
+# Pushes often arrive in bursts (a merge, then a tag, then CI commits); wait for the burst to end.
+DEFAULT_DEBOUNCE_SECONDS = 10.0
+# GitHub redelivers on timeouts, so remember this many delivery ids to drop the repeats.
+DELIVERY_CACHE_SIZE = 10000
+UPDATE = "update"
+REMOVE = "remove"
+
+
+def verify_signature(secret: str, body: bytes, signature_header: Optional[str]) -> bool:
+    """Check an X-Hub-Signature-256 header (sha256=<hex HMAC of the body>) in constant time."""
+    if not signature_header or not signature_header.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest().encode("ascii")
+    # Compared as bytes: compare_digest raises TypeError for str arguments that aren't pure ASCII.
+    return hmac.compare_digest(expected, signature_header[len("sha256="):].encode("utf-8"))
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    """The X-Hub-Signature-256 value GitHub would send for body."""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def repo_changes_for_event(event: str, payload: dict) -> list:
+    """
+    The (action, repo_name, repo_url) updates a webhook event calls for, or [] if it changes nothing we store.
+
+    Pushes only matter on the default branch, since that is what language stats and commit dates are
+    read from. Deleted repos are removed, renamed ones are removed under their old name and fetched
+    under the new one, and any other repository event re-fetches the repo.
+    """
+    repository = payload.get("repository") or {}
+    repo_url = repository.get("html_url")
+    repo_name = (repository.get("name") or "").lower()
+    if not repo_url or not repo_name:
+        return []
+
+    if event == "push":
+        default_branch = repository.get("default_branch") or repository.get("master_branch")
+        if default_branch and payload.get("ref") != f"refs/heads/{default_branch}":
+            return []
+        return [(UPDATE, repo_name, repo_url)]
+    if event == "repository":
+        action = payload.get("action")
+        if action == "deleted":
+            return [(REMOVE, repo_name, repo_url)]
+        changes = [(UPDATE, repo_name, repo_url)]
+        old_name = ((payload.get("changes") or {}).get("repository") or {}).get("name", {}).get("from")
+        if action == "renamed" and old_name:
+            changes.insert(0, (REMOVE, old_name.lower(), repo_url))
+        return changes
+    return []
+
+
+class DeliveryDeduplicator:
+    """Remembers the most recent delivery ids so that redelivered events are only handled once."""
+
+    def __init__(self, max_size: int = DELIVERY_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, delivery_id: Optional[str]) -> bool:
+        """Record delivery_id and return True if it had already been seen."""
+        if not delivery_id:
+            return False
+        with self._lock:
+            if delivery_id in self._seen:
+                self._seen.move_to_end(delivery_id)
+                return True
+            self._seen[delivery_id] = None
+            if len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+            return False
+
+
+class RepoUpdateQueue:
+    """
+    Debounced single-repo updates applied to the JSON at DATA_SAVE_PATH.
+
+    Each event pushes its repo's deadline back by debounce_seconds, so a burst of pushes costs one
+    fetch. Due repos are fetched with RepositoryFetcher.get_url_data and written back in one atomic
+    rewrite of the data file, with a matching delta appended to the snapshot store if there is one.
+    Transient fetch errors are retried with backoff, up to the fetcher's max_retries; other errors leave
+    the stored data untouched. close() waits for retries that are still due.
+    """
+
+    def __init__(self, fetcher, data_path: str, snapshot_store: Optional[SnapshotStore] = None,
+                 debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS) -> None:
+        self.fetcher = fetcher
+        self.data_path = data_path
+        self.snapshot_store = snapshot_store
+        self.debounce_seconds = debounce_seconds
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        # flush() may apply changes on the caller's thread while the worker applies others.
+        self._write_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="webhook-updates", daemon=True)
+        self._worker.start()
+
+    def submit(self, action: str, repo_name: str, repo_url: str, delay: Optional[float] = None, attempt: int = 0) -> None:
+        """Schedule an update or removal of repo_name, replacing any not yet applied change to it."""
+        due_at = time.monotonic() + (self.debounce_seconds if delay is None else delay)
+        with self._condition:
+            self._pending[repo_name] = (due_at, action, repo_url, attempt)
+            self._condition.notify()
+
+    def flush(self) -> None:
+        """Apply every pending change now, without waiting for its debounce to expire."""
+        with self._condition:
+            due = self._pending
+            self._pending = {}
+        self._apply(due)
+
+    def close(self) -> None:
+        """Stop the worker and apply every pending change, including retries the final updates schedule."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
+        self.flush()
+        while True:
+            with self._condition:
+                if not self._pending:
+                    return
+                delay = min(entry[0] for entry in self._pending.values()) - time.monotonic()
+            if delay > 0:
+                logging.info(f"Waiting {delay:.0f}s to retry {len(self._pending)} webhook updates before exiting")
+                time.sleep(delay)
+            self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed:
+                    now = time.monotonic()
+                    next_due = min((entry[0] for entry in self._pending.values()), default=None)
+                    if next_due is not None and next_due <= now:
+                        break
+                    self._condition.wait(None if next_due is None else next_due - now)
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = {name: entry for name, entry in self._pending.items() if entry[0] <= now}
+                for name in due:
+                    del self._pending[name]
+            self._apply(due)
+
+    def _apply(self, due: dict) -> None:
+        if not due:
+            return
+        changed, removed = {}, []
+        for repo_name, (_, action, repo_url, attempt) in due.items():
+            if action == REMOVE:
+                removed.append(repo_name)
+                continue
+            try:
+                repo = self.fetcher.get_url_data(repo_url)
+            except Exception as e:
+                if is_transient(e) and attempt < self.fetcher.max_retries:
+                    self.submit(action, repo_name, repo_url, delay=backoff_delay(attempt), attempt=attempt + 1)
+                else:
+                    logging.error(f"Dropping webhook update for {repo_name}: {e}")
+                continue
+            changed[repo.name] = repo.to_dict()
+        if changed or removed:
+            self._write(changed, removed)
+
+    def _write(self, changed: dict, removed: list) -> None:
+        with self._write_lock:
+            data = load_json_from_file(self.data_path) if os.path.exists(self.data_path) and os.path.getsize(self.data_path) else {}
+            for name, repo_data in changed.items():
+                # Webhook fetches don't collect commit stats, so keep the ones the last full run stored.
+                previous = data.get(name) or {}
+                repo_data.update({field: previous[field] for field in REPO_STAT_FIELDS if field in previous and field not in repo_data})
+            removed = [name for name in removed if data.pop(name, None) is not None and name not in changed]
+            data.update(changed)
+            write_json_to_file(json_obj=data, file_path=self.data_path)
+            if self.snapshot_store and not self.snapshot_store.index:
+                # A first snapshot of just this batch would make the rest of the fleet look missing.
+                self.snapshot_store.append(data)
+            elif self.snapshot_store:
+                self.snapshot_store.append_changes(changed, removed)
+        logging.info(f"Webhook updates applied: {len(changed)} repos updated, {len(removed)} removed")
+
+
+class WebhookReceiver:
+    """Verifies, de-duplicates and dispatches webhook deliveries, independently of the HTTP server."""
+
+    def __init__(self, secret: str, update_queue: RepoUpdateQueue, deduplicator: Optional[DeliveryDeduplicator] = None) -> None:
+        if not secret:
+            raise ValueError("A webhook secret is required to verify deliveries.")
+        self.secret = secret
+        self.update_queue = update_queue
+        self.deduplicator = deduplicator or DeliveryDeduplicator()
+
+    def handle(self, event: Optional[str], delivery_id: Optional[str], signature: Optional[str], body: bytes) -> tuple:
+        """Process one delivery and return the (HTTP status, message) to answer it with."""
+        if not verify_signature(self.secret, body, signature):
+            metrics.inc(WEBHOOK_EVENTS, {"event": event or "unknown", "outcome": "bad_signature"})
+            return 401, "Invalid signature"
+        if self.deduplicator.is_duplicate(delivery_id):
+            metrics.inc(WEBHOOK_EVENTS, {"event": event, "outcome": "duplicate"})
+            return 200, "Duplicate delivery ignored"
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            metrics.inc(WEBHOOK_EVENTS, {"event": event, "outcome": "bad_payload"})
+            return 400, "Body is not JSON"
+
+        changes = repo_changes_for_event(event, payload)
+        for action, repo_name, repo_url in changes:
+            self.update_queue.submit(action, repo_name, repo_url)
+        metrics.inc(WEBHOOK_EVENTS, {"event": event, "outcome": "queued" if changes else "ignored"})
+        return (202, f"Queued {len(changes)} repo updates") if changes else (200, "Event ignored")
+
+
+class _WebhookRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != WEBHOOK_PATH:
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status, message = self.server.receiver.handle(
+            self.headers.get("X-GitHub-Event"),
+            self.headers.get("X-GitHub-Delivery"),
+            self.headers.get("X-Hub-Signature-256"),
+            body
+        )
+        response = message.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_webhook_server(receiver: WebhookReceiver, port: Optional[int] = None, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve receiver at POST /webhook on a daemon thread (port defaults to WEBHOOK_PORT)."""
+    port = port or int(os.environ.get("WEBHOOK_PORT", DEFAULT_WEBHOOK_PORT))
+    server = ThreadingHTTPServer((host, port), _WebhookRequestHandler)
+    server.receiver = receiver
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Listening for webhooks on http://{host}:{port}{WEBHOOK_PATH}")
+    return server
+
+
+def replay_events(events_path: str, target_url: str, secret: str) -> list:
+    """
+    POST recorded deliveries to a running receiver, signed with secret, and return the response statuses.
+
+    events_path is a JSON lines file with one {"event": ..., "delivery": ..., "payload": {...}} object per
+    line, so real deliveries copied from GitHub's webhook settings page can be replayed locally.
+    """
+    if not secret:
+        raise ValueError("A webhook secret is required to sign replayed deliveries.")
+    statuses = []
+    with open(events_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            delivery = json.loads(line)
+            body = json.dumps(delivery["payload"]).encode("utf-8")
+            response = requests.post(target_url, data=body, headers={
+                "Content-Type": "application/json",
+                "X-GitHub-Event": delivery["event"],
+                "X-GitHub-Delivery": delivery.get("delivery", ""),
+                "X-Hub-Signature-256": sign_payload(secret, body),
+            })
+            logging.info(f"Replayed {delivery['event']} {delivery.get('delivery', '')}: {response.status_code} {response.text}")
+            statuses.append(response.status_code)
+    return statuses
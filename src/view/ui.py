@@ -1,64 +1,78 @@
 import os
+import html
 from dotenv import load_dotenv
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
-    QComboBox, QGroupBox, QPushButton, QProgressBar, QAbstractItemView
+    QComboBox, QGroupBox, QPushButton, QProgressBar, QAbstractItemView, QLineEdit
 )
-from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon, QPixmap
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from utils.git_utils import GithubActionManager, GitCommands
 from view.styles.style import language_colors, qwidget_styling
-from utils.utils import create_set_from_txt, write_json_to_file
+from utils.utils import write_json_to_file
+from utils.repo_urls import load_repo_urls
+from utils.metrics import export_metrics
+from utils.fleet_analytics import compute_fleet_analytics, top_cooccurring_pairs
+from utils.snapshot_store import record_snapshot
+from utils.search_index import TrigramIndex
+from utils.profiling import profile_phase
 from models.RepositoryDataFetcher import RepositoryFetcher
+from models.RepoDataset import RepoDataset
 from time import sleep
 
 load_dotenv()
-GIT_API_KEY = os.environ.get("GIT_API_KEY")
+# Authorization is added per request from the token pool built from GIT_API_KEYS / GIT_API_KEY.
 HEADERS = {
     'Accept': 'application/vnd.github.v3+json',
-    'Authorization': f'Bearer {GIT_API_KEY}',
     'X-GitHub-Api-Version': '2022-11-28'
 }
 
 def get_git_repo_url(repo_file_path):
-    return create_set_from_txt(repo_file_path)
+    return load_repo_urls(repo_file_path)
 
 def collect_data(git_urls, repository_fetcher):
     total_items = len(git_urls)
-    for i, git_url in enumerate(git_urls, 1):
-        data = repository_fetcher.get_url_data(git_url)
+    for i, data in enumerate(repository_fetcher.fetch_all(git_urls), 1):
         yield data, i, total_items
 
 class DataGenerationSignals(QObject):
     progress = pyqtSignal(int)
     status_update = pyqtSignal(str)
-    data_ready = pyqtSignal(dict)
+    data_ready = pyqtSignal(object)
     finished = pyqtSignal()
 
 class DataGenerationTask(QRunnable):
-    def __init__(self, git_urls, headers):
+    def __init__(self, git_urls, headers, previous_data=None):
         super().__init__()
         self.git_urls = git_urls
         self.headers = headers
+        self.previous_data = previous_data
         self.signals = DataGenerationSignals()
 
     def run(self):
-        data_fetcher = RepositoryFetcher(scmType="github", headers=self.headers)
-        combined_repo_data = {}
-
-        for data, i, total_items in collect_data(self.git_urls, data_fetcher):
-            json_repo_data = data.to_dict()
-            combined_repo_data[data.name] = json_repo_data
-
-            progress_percent = int(i / total_items * 100)
-            self.signals.progress.emit(progress_percent)
-            self.signals.status_update.emit(f"Processed {i}/{total_items} repositories.")
-
-        write_json_to_file(json_obj=combined_repo_data, file_path=os.environ.get("DATA_SAVE_PATH"))
-        self.signals.data_ready.emit(combined_repo_data)
-        self.signals.finished.emit()
+        with profile_phase("data_generation_task"):
+            data_fetcher = RepositoryFetcher(scmType="github", headers=self.headers, previous_data=self.previous_data)
+            repos = []
+
+            for data, i, total_items in collect_data(self.git_urls, data_fetcher):
+                repos.append(data)
+
+                progress_percent = int(i / total_items * 100)
+                self.signals.progress.emit(progress_percent)
+                self.signals.status_update.emit(f"Processed {i}/{total_items} repositories.")
+
+            combined_repo_data = RepoDataset.from_repos(sorted(repos, key=lambda repo: repo.name))
+            json_data = combined_repo_data.to_dict()
+            write_json_to_file(json_obj=json_data, file_path=os.environ.get("DATA_SAVE_PATH"))
+            record_snapshot(json_data)
+            export_metrics()
+            failed_repos = [repo.name for repo in repos if repo.fetch_error]
+            if failed_repos:
+                self.signals.status_update.emit(f"Could not fetch {len(failed_repos)} repositories: {', '.join(failed_repos)}")
+            self.signals.data_ready.emit(combined_repo_data)
+            self.signals.finished.emit()
 
 class RepoDownloadSignals(QObject):
     progress = pyqtSignal(int)
@@ -72,29 +86,40 @@ class RepoDownloadTask(QRunnable):
         self.signals = RepoDownloadSignals()
 
     def run(self):
-        total_repos = len(self.repo_urls)
-        git_actions = GithubActionManager()
-
-        for i, repo_url in enumerate(self.repo_urls, 1):
-            git_actions.git_run_commands(
-                GitCommands.CLONE,
-                working_directory=os.environ.get("GIT_CLONE_FOLDER_PATH"),
-                git_url=repo_url
-            )
-            progress_percent = int(i / total_repos * 100)
-            self.signals.progress.emit(progress_percent)
-            self.signals.status_update.emit(f"Downloaded {i}/{total_repos} repositories: {self.repo_urls}")
-
-        self.signals.finished.emit()
+        with profile_phase("repo_download_task"):
+            total_repos = len(self.repo_urls)
+            git_actions = GithubActionManager()
+            if git_actions.mirror_cache:
+                # Fetch every mirror in parallel first; the clones below are then local copies.
+                self.signals.status_update.emit(f"Updating mirrors of {total_repos} repositories...")
+                git_actions.mirror_cache.refresh(self.repo_urls)
+
+            for i, repo_url in enumerate(self.repo_urls, 1):
+                git_actions.git_run_commands(
+                    GitCommands.CLONE,
+                    working_directory=os.environ.get("GIT_CLONE_FOLDER_PATH"),
+                    git_url=repo_url
+                )
+                progress_percent = int(i / total_repos * 100)
+                self.signals.progress.emit(progress_percent)
+                self.signals.status_update.emit(f"Downloaded {i}/{total_repos} repositories: {self.repo_urls}")
+
+            if git_actions.mirror_cache:
+                git_actions.mirror_cache.evict()
+            export_metrics()
+            self.signals.finished.emit()
 
 class MainWindow(QWidget):
     def __init__(self, data: dict):
         super().__init__()
-        self.data = data
+        self.data = data if isinstance(data, RepoDataset) else RepoDataset.from_dict(data)
         self.threadpool = QThreadPool()
         self.language_colors = language_colors
         self.selected_repo_urls = []
+        self.search_index = TrigramIndex()
+        self._table_rows = {}
         self.initUI()
+        self.build_search_index()
 
     def initUI(self) -> None:
         self.setWindowTitle('Repository Language Breakdown')
@@ -117,6 +142,13 @@ class MainWindow(QWidget):
     def create_controls_layout(self) -> QHBoxLayout:
         controls_layout = QHBoxLayout()
 
+        # Fuzzy search box
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText('Search repositories, URLs or languages')
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.textChanged.connect(self.apply_search_filter)
+        controls_layout.addWidget(self.search_box)
+
         # Language filter combo box
         self.language_filter_combo = QComboBox()
         self.language_filter_combo.addItem('Filter by Language')
@@ -145,6 +177,10 @@ class MainWindow(QWidget):
         self.download_button.clicked.connect(self.download_selected_repos)
         controls_layout.addWidget(self.download_button)
 
+        self.analytics_button = QPushButton('Fleet Analytics')
+        self.analytics_button.clicked.connect(self.show_fleet_analytics)
+        controls_layout.addWidget(self.analytics_button)
+
         return controls_layout
 
     def create_content_layout(self) -> QHBoxLayout:
@@ -205,51 +241,96 @@ class MainWindow(QWidget):
         return self.progress_bar
 
     def get_sorted_languages(self) -> list:
-        languages = {lang for repo_data in self.data.values() for lang in repo_data['languages']}
-        return sorted(languages)
+        return self.data.languages_in_use()
 
     def populate_table(self) -> None:
-        self.table.setRowCount(0)
-        filter_language = self.language_filter_combo.currentText()
-        filter_language = None if filter_language == 'Filter by Language' else filter_language
-
-        for repo_name, repo_data in self.data.items():
-            if filter_language and filter_language not in repo_data['languages']:
-                continue
+        with profile_phase("populate_table"):
+            self.table.setRowCount(0)
+            self._table_rows = {}
+            filter_language = self.language_filter_combo.currentText()
+            filter_language = None if filter_language == 'Filter by Language' else filter_language
+
+            for repo_name in self.data:
+                if filter_language and not self.data.has_language(repo_name, filter_language):
+                    continue
+
+                languages = self.data.languages(repo_name)
+                row_position = self.table.rowCount()
+                self.table.insertRow(row_position)
+                self.table.setItem(row_position, 0, QTableWidgetItem(repo_name))
+                self.table.setItem(row_position, 1, QTableWidgetItem(', '.join(languages.keys())))
+                self.table.setItem(row_position, 2, QTableWidgetItem(str(len(languages))))
+                self._table_rows[repo_name] = row_position
+
+            self.table.resizeColumnsToContents()
+            self.status_label.setText(f'Repositories filtered by {filter_language}' if filter_language else 'All repositories displayed')
+            self.apply_search_filter()
 
-            row_position = self.table.rowCount()
-            self.table.insertRow(row_position)
-            self.table.setItem(row_position, 0, QTableWidgetItem(repo_name))
-            self.table.setItem(row_position, 1, QTableWidgetItem(', '.join(repo_data['languages'].keys())))
-            self.table.setItem(row_position, 2, QTableWidgetItem(str(len(repo_data['languages']))))
+    def sort_table(self) -> None:
+        with profile_phase("sort_table"):
+            selected_language = self.language_combo.currentText()
+            selected_language = None if selected_language == 'Select Language to Sort By' else selected_language
+            filter_language = self.language_filter_combo.currentText()
+            filter_language = None if filter_language == 'Filter by Language' else filter_language
+
+            repo_list = [
+                (repo_name, self.data.language_percentage(repo_name, selected_language) if selected_language else 0)
+                for repo_name in self.data
+                if not filter_language or self.data.has_language(repo_name, filter_language)
+            ]
+
+            sorted_repos = sorted(repo_list, key=lambda x: x[1], reverse=True) if selected_language else repo_list
+
+            self.table.setRowCount(0)
+            self._table_rows = {}
+            for repo_name, _ in sorted_repos:
+                languages = self.data.languages(repo_name)
+                row_position = self.table.rowCount()
+                self.table.insertRow(row_position)
+                self.table.setItem(row_position, 0, QTableWidgetItem(repo_name))
+                self.table.setItem(row_position, 1, QTableWidgetItem(', '.join(languages.keys())))
+                self.table.setItem(row_position, 2, QTableWidgetItem(str(len(languages))))
+                self._table_rows[repo_name] = row_position
+
+            self.table.resizeColumnsToContents()
+            self.status_label.setText(f'Repositories sorted by {selected_language}' if selected_language else 'Repositories displayed without sorting')
+            self.apply_search_filter()
+
+    def build_search_index(self) -> None:
+        """Bring the search index in line with self.data, a batch at a time between UI events."""
+        for stale_name in [name for name in self.search_index.keys() if name not in self.data]:
+            self.search_index.remove(stale_name)
+        self._index_batches = self.search_index.add_repos(self.data.items())
+        self._index_next_batch()
+
+    def _index_next_batch(self) -> None:
+        batches = self._index_batches
+        if next(batches, None) is None:
+            return
+        if self.search_box.text():
+            self.apply_search_filter()
+        # Only keep going if no newer build has replaced this one in the meantime.
+        QTimer.singleShot(0, lambda: self._index_next_batch() if self._index_batches is batches else None)
+
+    def apply_search_filter(self) -> None:
+        """Hide the table rows that don't match the search box, without rebuilding the table."""
+        query = self.search_box.text().strip()
+        if not query:
+            for row in self._table_rows.values():
+                self.table.setRowHidden(row, False)
+            return
 
-        self.table.resizeColumnsToContents()
-        self.status_label.setText(f'Repositories filtered by {filter_language}' if filter_language else 'All repositories displayed')
+        matches = self.search_index.search(query)
+        matched_names = {repo_name for repo_name, _ in matches}
+        for repo_name, row in self._table_rows.items():
+            self.table.setRowHidden(row, repo_name not in matched_names)
 
-    def sort_table(self) -> None:
-        selected_language = self.language_combo.currentText()
-        selected_language = None if selected_language == 'Select Language to Sort By' else selected_language
-        filter_language = self.language_filter_combo.currentText()
-        filter_language = None if filter_language == 'Filter by Language' else filter_language
-
-        repo_list = [
-            (repo_name, repo_data, repo_data['languages'].get(selected_language, 0))
-            for repo_name, repo_data in self.data.items()
-            if not filter_language or filter_language in repo_data['languages']
-        ]
-
-        sorted_repos = sorted(repo_list, key=lambda x: x[2], reverse=True) if selected_language else repo_list
-
-        self.table.setRowCount(0)
-        for repo_name, repo_data, _ in sorted_repos:
-            row_position = self.table.rowCount()
-            self.table.insertRow(row_position)
-            self.table.setItem(row_position, 0, QTableWidgetItem(repo_name))
-            self.table.setItem(row_position, 1, QTableWidgetItem(', '.join(repo_data['languages'].keys())))
-            self.table.setItem(row_position, 2, QTableWidgetItem(str(len(repo_data['languages']))))
-
-        self.table.resizeColumnsToContents()
-        self.status_label.setText(f'Repositories sorted by {selected_language}' if selected_language else 'Repositories displayed without sorting')
+        visible_matches = [repo_name for repo_name, _ in matches if repo_name in self._table_rows]
+        if visible_matches:
+            self.table.scrollToItem(self.table.item(self._table_rows[visible_matches[0]], 0))
+            self.status_label.setText(f"{len(visible_matches)} repositories match '{query}', best match: {visible_matches[0]}")
+        else:
+            self.status_label.setText(f"No repositories match '{query}'")
 
     def display_language_breakdown(self, row: int, column: int) -> None:
         repo_name_item = self.table.item(row, 0)
@@ -266,6 +347,12 @@ class MainWindow(QWidget):
         <p><b>Public SCM:</b> {repo_data['public_scm']}</p>
         <p><b>Public URL:</b> <a href="{repo_data['public_url']}">{repo_data['public_url']}</a></p>
         """
+        if repo_data.get('weekly_commit_activity') is not None:
+            details_html += f"<p><b>Commits in the last year:</b> {sum(repo_data['weekly_commit_activity'])}</p>"
+        if repo_data.get('contributor_count') is not None:
+            details_html += f"<p><b>Contributors:</b> {repo_data['contributor_count']}</p>"
+        if repo_data.get('fetch_error'):
+            details_html += f"<p><b>Could not fetch this repository:</b> {html.escape(repo_data['fetch_error'])}</p>"
         self.repo_details_label.setText(details_html)
         icon_path = f'icons/{repo_name}.png'
         if os.path.exists(icon_path):
@@ -276,6 +363,10 @@ class MainWindow(QWidget):
 
     def plot_language_breakdown(self, repo_name: str, languages: dict) -> None:
         self.figure.clear()
+        if not languages:
+            # e.g. a repo that could not be fetched; the details panel says why.
+            self.canvas.draw()
+            return
         ax = self.figure.add_subplot(111)
         labels, sizes = zip(*sorted(languages.items(), key=lambda x: x[1], reverse=True))
         colors = [self.language_colors.get(lang, 'grey') for lang in labels]
@@ -286,6 +377,43 @@ class MainWindow(QWidget):
         self.figure.tight_layout()
         self.canvas.draw()
 
+    def show_fleet_analytics(self) -> None:
+        """Show fleet-wide language share, co-occurrence and commit age in the details panel and plot."""
+        report = compute_fleet_analytics(self.data)
+        languages = report['languages']
+        if not languages:
+            self.status_label.setText("No repository data to analyse.")
+            return
+
+        # Byte counts are missing for GitLab, Bitbucket and older data, which would count as 0% of the share.
+        coverage = report['language_bytes_coverage']
+        share_key = 'share' if coverage['repos_with_bytes'] == coverage['repos_with_languages'] else 'mean_percentage'
+        top_languages = sorted(languages.items(), key=lambda x: x[1][share_key], reverse=True)[:15]
+
+        self.figure.clear()
+        ax = self.figure.add_subplot(111)
+        labels = [lang for lang, _ in top_languages]
+        ax.barh(labels, [stats[share_key] for _, stats in top_languages],
+                color=[self.language_colors.get(lang, 'grey') for lang in labels])
+        ax.set_xlabel('Share of code (%)' if share_key == 'share' else 'Mean percentage per repository')
+        ax.set_title(f"Language Share Across {report['repo_count']} Repositories")
+        ax.invert_yaxis()
+        self.figure.tight_layout()
+        self.canvas.draw()
+
+        cooccurrence = report['language_cooccurrence']
+        pairs = top_cooccurring_pairs(cooccurrence['languages'], cooccurrence['matrix'], limit=5)
+        pairs_html = ''.join(f"<li>{first} + {second}: {count} repos</li>" for first, second, count in pairs)
+        ages_html = ''.join(f"<li>{bucket}: {count}</li>" for bucket, count in report['last_commit_age']['buckets'].items())
+        self.repo_icon_label.clear()
+        self.repo_details_label.setText(f"""
+        <h3>Fleet Analytics</h3>
+        <p><b>Repositories:</b> {report['repo_count']} <b>Languages:</b> {len(languages)}</p>
+        <p><b>Most common language pairs:</b></p><ul>{pairs_html}</ul>
+        <p><b>Last commit age:</b></p><ul>{ages_html}</ul>
+        """)
+        self.status_label.setText("Fleet analytics displayed.")
+
     def handle_repo_selection(self) -> None:
         """Handle multi-selection of repositories."""
         selected_items = self.table.selectedItems()
@@ -315,7 +443,7 @@ class MainWindow(QWidget):
 
         git_urls = get_git_repo_url(os.environ.get("GIT_REPOS_LIST_PATH"))
 
-        task = DataGenerationTask(git_urls, HEADERS)
+        task = DataGenerationTask(git_urls, HEADERS, previous_data=self.data)
         task.signals.progress.connect(self.update_progress_bar)
         task.signals.status_update.connect(self.status_label.setText)
         task.signals.data_ready.connect(self.update_data)
@@ -325,8 +453,9 @@ class MainWindow(QWidget):
 
     def update_data(self, new_data):
         """Update the data and refresh the table."""
-        self.data = new_data
+        self.data = new_data if isinstance(new_data, RepoDataset) else RepoDataset.from_dict(new_data)
         self.populate_table()
+        self.build_search_index()
 
     def on_data_generation_finished(self):
         """Handle actions after data generation is complete."""
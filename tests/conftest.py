@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import pytest
+import requests
+
+# The app imports its modules flat from src/ (utils.x, models.X), as main.py does when run from there.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from models.Repo import Repo
+from utils.repo_urls import RepoUrl, parse_repo_url
+
+
+@pytest.fixture
+def make_response():
+    """Builds a requests.Response with the given status code and headers."""
+    def make_response(status_code=200, url="https://api.github.com/repos/o/r", **headers):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers)
+        response.url = url
+        return response
+    return make_response
+
+
+@pytest.fixture
+def make_repo():
+    """Builds a fetched Repo for a URL or RepoUrl. Keyword arguments set any other Repo attribute."""
+    def make_repo(url, languages=None, **fields):
+        repo_url = url if isinstance(url, RepoUrl) else parse_repo_url(url)
+        repo = Repo(public_git_url=repo_url.public_git_url, name=repo_url.name.lower(),
+                    languages={"Python": 100.0} if languages is None else languages, public_scm=repo_url.scm,
+                    public_url=repo_url.public_url)
+        for field, value in fields.items():
+            setattr(repo, field, value)
+        return repo.mark_fetched()
+    return make_repo
+
+
+@pytest.fixture
+def git():
+    """Runs a git command in cwd with a fixed identity, failing the test if it fails."""
+    def git(cwd, *args):
+        subprocess.run(["git", "-c", "user.name=dev", "-c", "user.email=dev@example.com", *args], cwd=cwd, check=True, capture_output=True)
+    return git
@@ -0,0 +1,94 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from models.RepositoryDataFetcher import RepositoryFetcher
+from utils.commit_stats import COMMIT_ACTIVITY, CONTRIBUTORS, CommitStatsCollector
+from utils.repo_urls import parse_repo_url
+
+
+class FakeStatsProvider:
+    """Answers "still computing" (None) for the first pending_polls requests of every stat."""
+    supports_repo_stats = True
+
+    def __init__(self, pending_polls=1):
+        self.pending_polls = pending_polls
+        self.polls = {}
+        self.stats_executor = ThreadPoolExecutor(max_workers=4)
+
+    def get_repo_stats(self, owner, repo_name, stat):
+        key = (owner, repo_name, stat)
+        self.polls[key] = self.polls.get(key, 0) + 1
+        if self.polls[key] <= self.pending_polls:
+            return None
+        if stat == COMMIT_ACTIVITY:
+            return [{"total": len(owner)}] * 52
+        return [{}] * len(owner)
+
+
+class FakeProviders:
+    def __init__(self, provider):
+        self.provider = provider
+
+    def for_url(self, repo_url):
+        return self.provider
+
+
+@pytest.fixture
+def provider():
+    provider = FakeStatsProvider()
+    yield provider
+    provider.stats_executor.shutdown()
+
+
+def _fetched(make_repo, url):
+    repo_url = parse_repo_url(url)
+    return repo_url, make_repo(repo_url)
+
+
+def test_repos_with_the_same_name_are_tracked_separately(provider, make_repo):
+    collector = CommitStatsCollector(FakeProviders(provider), poll_interval=0.01)
+    fetched = [_fetched(make_repo, "https://github.com/a/utils"), _fetched(make_repo, "https://github.com/bbb/utils")]
+
+    results = {repo_url.owner: repo for repo_url, repo in collector.attach(fetched)}
+
+    assert set(results) == {"a", "bbb"}
+    assert results["a"].contributor_count == 1
+    assert results["bbb"].contributor_count == 3
+    assert results["bbb"].weekly_commit_activity == [3] * 52
+    assert all(count == 2 for count in provider.polls.values())
+
+
+def test_failed_fetches_and_slow_stats_pass_through(provider, make_repo):
+    provider.pending_polls = 100
+    collector = CommitStatsCollector(FakeProviders(provider), poll_interval=0.01, max_wait=0.05)
+    failed_url = parse_repo_url("https://github.com/a/failed")
+    failed = make_repo(failed_url, fetch_error="HTTPError: 404")
+
+    results = list(collector.attach([(failed_url, failed), _fetched(make_repo, "https://github.com/a/slow")]))
+
+    assert [repo.name for _, repo in results] == ["failed", "slow"]
+    assert results[1][1].contributor_count is None
+    assert ("a", "failed", CONTRIBUTORS) not in provider.polls
+
+
+def test_stats_polls_overlap_with_the_main_fetches(monkeypatch, make_repo):
+    monkeypatch.setenv("GITHUB_MAX_CONCURRENCY", "2")
+    fetched_at, polled_at = [], []
+
+    def get_url_data(repo_url):
+        time.sleep(0.01)
+        fetched_at.append(time.monotonic())
+        return make_repo(repo_url)
+
+    def get_repo_stats(self, owner, repo_name, stat):
+        polled_at.append(time.monotonic())
+        return []
+
+    monkeypatch.setattr("utils.scm_providers.GithubProvider.get_repo_stats", get_repo_stats)
+    fetcher = RepositoryFetcher(scmType="github", headers={}, collect_commit_stats=True)
+    fetcher.get_url_data = get_url_data
+    repos = list(fetcher.fetch_all([f"https://github.com/o/repo{i}" for i in range(40)]))
+
+    assert len(repos) == 40 and all(repo.contributor_count == 0 for repo in repos)
+    # The first poll goes out long before the main pass is over, not queued behind it.
+    assert min(polled_at) < sorted(fetched_at)[len(fetched_at) // 2]
@@ -0,0 +1,88 @@
+import time
+import pytest
+import requests
+from utils.credential_pool import CredentialPool, NoCredentialsAvailable
+from utils.git_utils import scm_request
+from utils.rate_limit import RateLimitPolicy
+
+
+def test_from_env_merges_and_deduplicates_tokens(monkeypatch):
+    monkeypatch.setenv("GIT_API_KEYS", "tok-a, tok-b,,tok-a")
+    monkeypatch.setenv("GIT_API_KEY", "tok-c")
+    assert [credential.token for credential in CredentialPool.from_env().credentials] == ["tok-a", "tok-b", "tok-c"]
+
+    monkeypatch.delenv("GIT_API_KEYS")
+    monkeypatch.delenv("GIT_API_KEY")
+    assert CredentialPool.from_env() is None
+
+
+def test_acquire_prefers_the_token_with_most_headroom(make_response):
+    pool = CredentialPool(["tok-a", "tok-b"])
+    first = pool.acquire()
+    pool.release(first, make_response(**{"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "10", "X-RateLimit-Reset": str(time.time() + 600)}))
+    assert pool.acquire().token != first.token
+
+
+def test_in_flight_requests_count_against_headroom():
+    pool = CredentialPool(["tok-a", "tok-b"])
+    tokens = {pool.acquire().token, pool.acquire().token}
+    assert tokens == {"tok-a", "tok-b"}
+
+
+def test_exhausted_token_is_usable_again_after_reset(make_response):
+    pool = CredentialPool(["tok-a"])
+    credential = pool.acquire()
+    pool.release(credential, make_response(**{"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() - 1)}))
+    assert pool.has_headroom()
+    pool.release(pool.acquire(), make_response(**{"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 600)}))
+    assert not pool.has_headroom()
+    assert pool.total_remaining() == 0
+
+
+def test_revoked_tokens_leave_the_rotation(make_response):
+    pool = CredentialPool(["tok-a", "tok-b"])
+    credential = pool.acquire()
+    pool.release(credential, make_response(401))
+    assert all(pool.acquire().token != credential.token for _ in range(3))
+
+    pool = CredentialPool(["tok-a"])
+    pool.release(pool.acquire(), make_response(401))
+    with pytest.raises(NoCredentialsAvailable):
+        pool.acquire()
+
+
+def test_acquire_skips_excluded_tokens():
+    pool = CredentialPool(["tok-a", "tok-b"])
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire(exclude=[first]).token != first.token
+    assert not pool.has_headroom(exclude=pool.credentials)
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.tokens = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.tokens.append(headers["Authorization"])
+        return self.responses.pop(0)
+
+
+def test_exhausted_token_is_rotated_out(make_response):
+    pool = CredentialPool(["tok-a", "tok-b"])
+    exhausted = make_response(403, **{"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 600)})
+    session = FakeSession([exhausted, make_response(200)])
+
+    assert scm_request("GET", "https://api.github.com/repos/o/r", session=session, credential_pool=pool).status_code == 200
+    assert len(set(session.tokens)) == 2
+
+
+def test_secondary_rate_limit_is_left_to_the_policy(make_response):
+    pool = CredentialPool(["tok-a", "tok-b"])
+    session = FakeSession([make_response(403, **{"Retry-After": "60", "X-RateLimit-Remaining": "4000"})])
+    policy = RateLimitPolicy(max_sleep=10)
+
+    with pytest.raises(requests.HTTPError):
+        scm_request("GET", "https://api.github.com/repos/o/r", session=session, credential_pool=pool, rate_limit_policy=policy)
+    assert len(session.tokens) == 1
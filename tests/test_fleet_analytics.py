@@ -0,0 +1,49 @@
+from datetime import date
+from models.RepoDataset import RepoDataset
+from utils.fleet_analytics import _live_entries, compute_fleet_analytics, language_bytes_coverage, language_totals
+
+
+def _repo(languages, language_bytes=None, last_commit_date=None):
+    data = {"public_git_url": "https://github.com/o/r.git", "languages": languages, "last_commit_date": last_commit_date}
+    if language_bytes is not None:
+        data["language_bytes"] = language_bytes
+    return data
+
+
+def test_language_totals_share_and_mean_percentage():
+    dataset = RepoDataset.from_dict({
+        "a": _repo({"Python": 75.0, "HTML": 25.0}, {"Python": 300, "HTML": 100}),
+        "b": _repo({"Python": 100.0}, {"Python": 600}),
+    })
+    totals = language_totals(dataset)
+    assert list(totals) == ["Python", "HTML"]
+    assert totals["Python"] == {"bytes": 900, "share": 90.0, "repo_count": 2, "mean_percentage": 87.5}
+    assert totals["HTML"]["mean_percentage"] == 12.5
+
+
+def test_coverage_counts_repos_without_bytes():
+    dataset = RepoDataset.from_dict({
+        "github": _repo({"Python": 100.0}, {"Python": 600}),
+        "gitlab": _repo({"Go": 100.0}),
+        "failed": _repo({}),
+    })
+    assert language_bytes_coverage(dataset) == {"repos_with_languages": 2, "repos_with_bytes": 1}
+    # Go has no bytes, so its share is 0% even though it is the only language of half the fleet.
+    assert language_totals(dataset)["Go"]["mean_percentage"] == 50.0
+
+
+def test_analytics_does_not_pin_the_dataset_columns():
+    dataset = RepoDataset.from_dict({"a": _repo({"Python": 100.0}, {"Python": 10}, "2024-01-01")})
+    report = compute_fleet_analytics(dataset, today=date(2024, 1, 31))
+    entries = _live_entries(dataset)
+    # Growing the array.array columns fails with BufferError while a NumPy view of them is alive.
+    dataset.add("b", _repo({"Rust": 100.0}, {"Rust": 5}))
+    assert report["repo_count"] == 1
+    assert entries[0].tolist() == [0]
+    assert len(dataset) == 2
+
+
+def test_removed_rows_are_excluded():
+    dataset = RepoDataset.from_dict({"a": _repo({"Python": 100.0}, {"Python": 10}), "b": _repo({"Rust": 100.0}, {"Rust": 5})})
+    dataset.remove("b")
+    assert list(language_totals(dataset)) == ["Python"]
@@ -0,0 +1,51 @@
+import pytest
+from models.RepositoryDataFetcher import RepositoryFetcher
+from utils.git_utils import calculate_language_percentages
+from utils.local_metadata import find_local_clone, read_local_repo
+from utils.repo_urls import parse_repo_url
+
+
+@pytest.fixture
+def clone_folder(tmp_path, git):
+    clone_path = tmp_path / "Repo"
+    clone_path.mkdir()
+    git(clone_path, "init", "-q")
+    (clone_path / "empty.py").write_text("")
+    (clone_path / "README.md").write_text("not code\n")
+    git(clone_path, "add", "-A")
+    git(clone_path, "commit", "-q", "-m", "init")
+    git(clone_path, "remote", "add", "origin", "https://github.com/owner/Repo.git")
+    return tmp_path
+
+
+def test_calculate_language_percentages():
+    assert calculate_language_percentages({"Python": 3, "HTML": 1}) == {"Python": 75.0, "HTML": 25.0}
+    assert calculate_language_percentages({"Python": 0}) == {}
+    assert calculate_language_percentages({}) == {}
+
+
+def test_clone_is_only_used_for_its_own_origin(clone_folder, git):
+    assert find_local_clone(parse_repo_url("https://github.com/OWNER/Repo.git/"), str(clone_folder)) is not None
+    assert find_local_clone(parse_repo_url("https://github.com/other-org/Repo"), str(clone_folder)) is None
+    assert find_local_clone(parse_repo_url("https://gitlab.com/owner/Repo"), str(clone_folder)) is None
+
+    git(clone_folder / "Repo", "remote", "remove", "origin")
+    assert find_local_clone(parse_repo_url("https://github.com/owner/Repo"), str(clone_folder)) is None
+
+
+def test_clone_with_only_empty_files(clone_folder):
+    repo_url = parse_repo_url("https://github.com/owner/Repo")
+    clone_path = find_local_clone(repo_url, str(clone_folder))
+    assert clone_path is not None
+
+    repo = read_local_repo(repo_url, clone_path)
+    assert repo.languages == {}
+    assert repo.last_commit_date is not None
+
+
+def test_fetch_all_stops_the_local_worker_processes(clone_folder):
+    fetcher = RepositoryFetcher(scmType="github", headers={}, local_clone_folder=str(clone_folder), collect_commit_stats=False)
+    repos = list(fetcher.fetch_all(["https://github.com/owner/Repo"]))
+
+    assert [repo.name for repo in repos] == ["repo"]
+    assert fetcher._local_executor is None
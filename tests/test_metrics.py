@@ -0,0 +1,41 @@
+import pytest
+from utils.metrics import MetricsRegistry, endpoint_label, HTTP_REQUEST_DURATION, HTTP_RESPONSES
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://api.github.com/repos/octo/hello/languages", "/repos/{owner}/{repo}/languages"),
+    ("https://api.github.com/repos/octo/hello/commits?per_page=1", "/repos/{owner}/{repo}/commits"),
+    ("https://api.github.com/orgs/acme/repos", "/orgs/{org}/repos"),
+    ("https://api.github.com/repos/octo", "/repos/{owner}"),
+])
+def test_endpoint_label_hides_identifiers(url, expected):
+    assert endpoint_label(url) == expected
+
+
+def test_counter_labels_are_order_independent():
+    registry = MetricsRegistry()
+    registry.inc(HTTP_RESPONSES, {"endpoint": "/rate_limit", "status": "200"})
+    registry.inc(HTTP_RESPONSES, {"status": "200", "endpoint": "/rate_limit"})
+
+    counters = {(c["name"], tuple(sorted(c["labels"].items()))): c["value"] for c in registry.summary()["counters"]}
+    assert counters[(HTTP_RESPONSES, (("endpoint", "/rate_limit"), ("status", "200")))] == 2
+
+
+def test_histogram_buckets_are_cumulative_in_prometheus_text():
+    registry = MetricsRegistry()
+    for value in (0.001, 0.3, 100.0):
+        registry.observe(HTTP_REQUEST_DURATION, value, {"endpoint": "/x"})
+
+    text = registry.to_prometheus_text()
+    assert 'repo_stats_http_request_duration_seconds_bucket{endpoint="/x",le="0.005"} 1' in text
+    assert 'repo_stats_http_request_duration_seconds_bucket{endpoint="/x",le="0.5"} 2' in text
+    assert 'repo_stats_http_request_duration_seconds_bucket{endpoint="/x",le="+Inf"} 3' in text
+    assert 'repo_stats_http_request_duration_seconds_count{endpoint="/x"} 3' in text
+
+
+def test_timer_observes_even_when_the_block_raises():
+    registry = MetricsRegistry()
+    with pytest.raises(ValueError):
+        with registry.timer(HTTP_REQUEST_DURATION):
+            raise ValueError("boom")
+    assert registry.summary()["timings"][0]["count"] == 1
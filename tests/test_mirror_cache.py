@@ -0,0 +1,62 @@
+import os
+import subprocess
+import pytest
+from utils.mirror_cache import MirrorCache
+from utils.repo_urls import RepoUrl, parse_repo_url
+
+
+@pytest.fixture
+def upstream(tmp_path, git):
+    """A bare repository on disk, addressed by a RepoUrl whose public_git_url is its path."""
+    work = tmp_path / "work"
+    work.mkdir()
+    git(work, "init", "-q")
+    (work / "main.py").write_text("print('hi')\n")
+    git(work, "add", "-A")
+    git(work, "commit", "-q", "-m", "init")
+    bare = tmp_path / "upstream" / "repo.git"
+    git(tmp_path, "clone", "-q", "--bare", str(work), str(bare))
+    return RepoUrl(url=str(bare), host="example.com", owner="Owner", name="Repo", scm="github")
+
+
+def test_mirror_path_stays_inside_the_cache(tmp_path):
+    cache = MirrorCache(str(tmp_path / "cache"))
+    assert cache.mirror_path(parse_repo_url("https://GitHub.com/Owner/Repo.git")) == os.path.join(cache.cache_dir, "github.com", "owner", "repo.git")
+    hostile = RepoUrl(url="x", host="example.com", owner="/../../etc", name="..", scm="github")
+    assert cache.mirror_path(hostile).startswith(cache.cache_dir + os.sep)
+
+
+def test_mirror_is_cloned_once_and_checked_out_locally(tmp_path, upstream, monkeypatch):
+    cache = MirrorCache(str(tmp_path / "cache"), refresh_interval=3600)
+    commands = []
+    run_git = cache._run_git
+    monkeypatch.setattr(cache, "_run_git", lambda label, command: (commands.append(label), run_git(label, command)))
+
+    mirror_path = cache.ensure_mirror(upstream)
+    assert cache.ensure_mirror(upstream) == mirror_path
+    assert commands == ["clone --mirror"]
+
+    checkout = tmp_path / "checkout"
+    checkout.mkdir()
+    for command in cache.clone_commands(upstream, mirror_path):
+        subprocess.run(command, cwd=checkout, check=True, capture_output=True)
+    assert (checkout / "Repo" / "main.py").exists()
+    origin = subprocess.run(["git", "-C", "Repo", "remote", "get-url", "origin"], cwd=checkout, check=True, capture_output=True, text=True)
+    assert origin.stdout.strip() == upstream.public_git_url
+
+
+def test_failed_first_clone_leaves_nothing_behind(tmp_path):
+    cache = MirrorCache(str(tmp_path / "cache"))
+    missing = RepoUrl(url=str(tmp_path / "missing.git"), host="example.com", owner="o", name="missing", scm="github")
+    assert cache.ensure_mirror(missing) is None
+    assert not os.path.exists(cache.mirror_path(missing))
+
+
+def test_evict_only_when_over_the_size_limit(tmp_path, upstream):
+    cache = MirrorCache(str(tmp_path / "cache"))
+    mirror_path = cache.ensure_mirror(upstream)
+    assert cache.evict() == []
+
+    cache.max_bytes = 0
+    assert cache.evict() == [mirror_path]
+    assert not os.path.exists(mirror_path)
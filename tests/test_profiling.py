@@ -0,0 +1,60 @@
+import os
+import cProfile
+import threading
+import pytest
+from utils import profiling
+from utils.profiling import profile_phase, write_profile_report
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "_phase_stats", {})
+    return tmp_path
+
+
+def _work():
+    return sum(i * i for i in range(1000))
+
+
+def test_disabled_without_profile_dir(monkeypatch, tmp_path):
+    monkeypatch.delenv("PROFILE_DIR", raising=False)
+    with profile_phase("phase"):
+        _work()
+    assert not os.listdir(tmp_path)
+
+
+def test_phases_are_written_and_nested_phases_count_in_the_outer_one(profile_dir):
+    with profile_phase("outer"):
+        with profile_phase("inner"):
+            _work()
+    assert sorted(os.listdir(profile_dir)) == ["outer.prof"]
+
+    report_path = write_profile_report(top_n=5)
+    with open(report_path, encoding="utf-8") as f:
+        assert "==== outer:" in f.read()
+
+
+def test_phase_runs_unprofiled_when_another_profiler_is_active(profile_dir, monkeypatch):
+    class BusyProfile(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            # What Python 3.12+ raises while another thread's profiler is active.
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling.cProfile, "Profile", BusyProfile)
+    with profile_phase("busy"):
+        assert _work()
+    assert os.listdir(profile_dir) == []
+
+
+def test_phases_on_other_threads_are_merged(profile_dir):
+    def run():
+        with profile_phase("worker"):
+            _work()
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert os.listdir(profile_dir) == ["worker.prof"]
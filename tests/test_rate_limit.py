@@ -0,0 +1,23 @@
+import time
+import pytest
+from utils.rate_limit import DEFAULT_RETRY_AFTER, RateLimitPolicy, rate_limit_delay
+
+
+def test_rate_limit_delay(make_response):
+    assert rate_limit_delay(make_response(200)) is None
+    assert rate_limit_delay(make_response(404)) is None
+    assert rate_limit_delay(make_response(429, **{"Retry-After": "7"})) == 7.0
+    assert rate_limit_delay(make_response(429)) == DEFAULT_RETRY_AFTER
+    # A 403 is only a rate limit when the budget is spent; otherwise it is a permissions error.
+    assert rate_limit_delay(make_response(403)) is None
+    reset = time.time() + 30
+    assert rate_limit_delay(make_response(403, **{"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)})) == pytest.approx(30, abs=2)
+    assert rate_limit_delay(make_response(429, **{"RateLimit-Remaining": "0", "RateLimit-Reset": str(reset)})) == pytest.approx(30, abs=2)
+
+
+def test_should_retry_respects_attempts_and_max_sleep(make_response):
+    policy = RateLimitPolicy(max_sleep=10, max_retries=2)
+    assert policy.should_retry(make_response(429, **{"Retry-After": "0"}), attempt=0)
+    assert not policy.should_retry(make_response(429, **{"Retry-After": "0"}), attempt=2)
+    assert not policy.should_retry(make_response(429, **{"Retry-After": "60"}), attempt=0)
+    assert not policy.should_retry(make_response(500), attempt=0)
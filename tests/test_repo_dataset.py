@@ -0,0 +1,65 @@
+from models.Repo import Repo
+from models.RepoDataset import RepoDataset
+
+REPO_DATA = {
+    "public_git_url": "https://github.com/octo/hello.git",
+    "name": "hello",
+    "languages": {"Python": 86.63, "HTML": 13.37},
+    "language_bytes": {"Python": 8663, "HTML": 1337},
+    "public_scm": "github",
+    "public_url": "https://github.com/octo/hello",
+    "last_commit_date": "2024-05-01",
+    "fetched_at": "2024-05-02T10:00:00+00:00",
+}
+
+
+def test_round_trips_the_json_shape():
+    dataset = RepoDataset.from_dict({"hello": REPO_DATA})
+    assert dataset.to_dict() == {"hello": REPO_DATA}
+
+
+def test_fields_without_a_column_pass_through():
+    repo_data = dict(REPO_DATA, fetch_error="HTTPError: 404", contributor_count=3)
+    assert RepoDataset.from_dict({"hello": repo_data})["hello"] == repo_data
+
+
+def test_fetch_times_and_commit_stats_are_stored_in_columns():
+    repo_data = dict(REPO_DATA, weekly_commit_activity=[0, 3] * 26, contributor_count=0)
+    dataset = RepoDataset.from_dict({"hello": repo_data, "bare": dict(REPO_DATA, weekly_commit_activity=[])})
+
+    assert dataset._extras == {}
+    assert dataset["hello"] == repo_data
+    assert dataset.weekly_commit_activity("bare") == []
+    assert "contributor_count" not in dataset["bare"]
+
+
+def test_fetch_times_in_another_form_are_kept_as_they_are():
+    for fetched_at in ("2024-05-02T12:00:00+02:00", "2024-05-02T10:00:00.5+00:00", "yesterday"):
+        repo_data = dict(REPO_DATA, fetched_at=fetched_at)
+        assert RepoDataset.from_dict({"hello": repo_data})["hello"] == repo_data
+
+
+def test_language_bytes_are_omitted_when_the_scm_has_none():
+    repo_data = {key: value for key, value in REPO_DATA.items() if key != "language_bytes"}
+    dataset = RepoDataset.from_dict({"hello": repo_data})
+    assert dataset.language_byte_counts("hello") is None
+    assert "language_bytes" not in dataset["hello"]
+
+
+def test_add_replaces_and_compact_drops_tombstones():
+    dataset = RepoDataset.from_dict({"hello": REPO_DATA, "other": dict(REPO_DATA, languages={"Go": 100.0}, language_bytes={"Go": 1})})
+    dataset.add("hello", dict(REPO_DATA, languages={"Rust": 100.0}, language_bytes={"Rust": 5}))
+    dataset.remove("other")
+
+    assert list(dataset) == ["hello"]
+    assert dataset.languages("hello") == {"Rust": 100.0}
+    assert dataset.languages_in_use() == ["Rust"]
+    dataset.compact()
+    assert len(dataset.names) == 1
+    assert dataset.language_percentage("hello", "Rust") == 100.0
+
+
+def test_from_repos_matches_repo_to_dict():
+    repo = Repo(public_git_url="https://github.com/octo/hello.git", name="hello", languages={"Python": 100.0},
+                public_scm="github", public_url="https://github.com/octo/hello")
+    assert RepoDataset.from_repos([repo])["hello"] == repo.to_dict()
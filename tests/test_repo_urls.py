@@ -0,0 +1,48 @@
+import pytest
+from utils.repo_urls import iter_repo_urls, parse_repo_url
+
+
+@pytest.mark.parametrize("url, host, owner, name", [
+    ("https://github.com/Owner/Repo", "github.com", "Owner", "Repo"),
+    ("https://GitHub.com/Owner/Repo.git/", "github.com", "Owner", "Repo"),
+    ("git@github.com:owner/repo.git", "github.com", "owner", "repo"),
+    ("https://gitlab.com/group/sub/project", "gitlab.com", "group/sub", "project"),
+    ("ssh://git@host.example.com:2222/owner/repo.git", "host.example.com", "owner", "repo"),
+])
+def test_parse_repo_url(url, host, owner, name):
+    repo_url = parse_repo_url(url)
+    assert (repo_url.host, repo_url.owner, repo_url.name) == (host, owner, name)
+
+
+@pytest.mark.parametrize("url", ["not a url", "https://github.com/", "https://github.com/only-owner/"])
+def test_parse_repo_url_rejects_non_repositories(url):
+    with pytest.raises(ValueError):
+        parse_repo_url(url)
+
+
+@pytest.mark.parametrize("url", [
+    "https://github.com/Owner/Repo",
+    "https://github.com/Owner/Repo/",
+    "https://github.com/Owner/Repo.git",
+    "https://github.com/Owner/Repo.git/",
+])
+def test_public_urls_ignore_trailing_slash_and_git_suffix(url):
+    repo_url = parse_repo_url(url)
+    assert repo_url.public_git_url == "https://github.com/Owner/Repo.git"
+    assert repo_url.public_url == "https://github.com/Owner/Repo"
+
+
+def test_iter_repo_urls_drops_duplicates_by_key(tmp_path):
+    repo_list = tmp_path / "repos.txt"
+    repo_list.write_text("\n".join([
+        "# comment",
+        "https://github.com/Owner/Repo",
+        "https://github.com/owner/repo.git/",
+        "https://github.com/Owner/Repo.git",
+        "",
+        "not a url",
+        "https://github.com/other/repo",
+    ]))
+    repo_urls = list(iter_repo_urls(str(repo_list)))
+    assert [repo_url.key for repo_url in repo_urls] == [("github.com", "owner", "repo"), ("github.com", "other", "repo")]
+    assert repo_urls[0].public_url == "https://github.com/Owner/Repo"
@@ -0,0 +1,31 @@
+import pytest
+from models.RepositoryDataFetcher import RepositoryFetcher
+from utils.repo_urls import parse_repo_url
+
+
+@pytest.fixture
+def fetcher(make_repo):
+    fetcher = RepositoryFetcher(scmType="github", headers={}, collect_commit_stats=False)
+    fetcher.get_url_data = make_repo
+    yield fetcher
+    fetcher.close()
+
+
+def test_fetch_all_closes_the_provider_pools(fetcher):
+    urls = ["https://github.com/a/one", "https://gitlab.com/b/two"]
+    repos = list(fetcher.fetch_all(urls))
+
+    assert sorted(repo.name for repo in repos) == ["one", "two"]
+    assert fetcher.providers.providers() == []
+
+
+def test_fetch_all_closes_when_the_consumer_stops_early(fetcher):
+    repos = fetcher.fetch_all(["https://github.com/a/one", "https://github.com/a/two"])
+    next(repos)
+    repos.close()
+    assert fetcher.providers.providers() == []
+
+
+def test_fetcher_is_usable_after_fetch_all(fetcher):
+    list(fetcher.fetch_all(["https://github.com/a/one"]))
+    assert [repo.name for repo in fetcher.fetch_all([parse_repo_url("https://github.com/a/two")])] == ["two"]
@@ -0,0 +1,128 @@
+import pytest
+import requests
+from models.RepositoryDataFetcher import RepositoryFetcher
+from utils.retry import CircuitBreaker, CircuitOpen, RetryQueue, backoff_delay, is_transient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("utils.retry.time.monotonic", clock)
+    return clock
+
+
+def test_circuit_opens_then_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("example.com", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpen) as raised:
+        breaker.before_request()
+    assert raised.value.retry_after == 60
+
+    clock.now += 61
+    breaker.before_request()
+    with pytest.raises(CircuitOpen):
+        breaker.before_request()
+    breaker.record_success()
+    breaker.before_request()
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker("example.com", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 61
+    breaker.before_request()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpen):
+        breaker.before_request()
+
+
+@pytest.mark.parametrize("error, transient", [
+    (CircuitOpen("example.com", 5), True),
+    (requests.ConnectionError(), True),
+    (requests.Timeout(), True),
+    (ValueError("bad url"), False),
+])
+def test_is_transient(error, transient):
+    assert is_transient(error) is transient
+
+
+@pytest.mark.parametrize("status_code, headers, transient", [
+    (503, {}, True),
+    (429, {}, True),
+    (403, {"X-RateLimit-Remaining": "0"}, True),
+    (403, {}, False),
+    (404, {}, False),
+])
+def test_is_transient_http_errors(make_response, status_code, headers, transient):
+    error = requests.HTTPError(f"{status_code} error", response=make_response(status_code, **headers))
+    assert is_transient(error) is transient
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, base_delay=2, max_delay=10) <= 10 for attempt in range(10))
+
+
+def test_retry_queue_orders_and_limits_attempts(clock):
+    queue = RetryQueue(max_retries=2, base_delay=0, max_delay=0)
+    assert queue.defer("a", 1, requests.Timeout())
+    assert queue.defer("b", 2, CircuitOpen("example.com", 30))
+    assert not queue.defer("c", 3, requests.Timeout())
+
+    assert queue.pop_ready() == [("a", 1)]
+    clock.now += 30
+    assert queue.pop_ready() == [("b", 2)]
+    assert len(queue) == 0
+
+
+def test_fetcher_retries_transient_errors_and_keeps_permanent_failures(monkeypatch, make_response, make_repo):
+    monkeypatch.setenv("FETCH_RETRY_BASE_DELAY", "0")
+    fetcher = RepositoryFetcher(scmType="github", headers={}, collect_commit_stats=False)
+    calls = {}
+
+    def flaky_get_url_data(repo_url):
+        calls[repo_url.name] = calls.get(repo_url.name, 0) + 1
+        if repo_url.name == "missing":
+            raise requests.HTTPError("404 error", response=make_response(404))
+        if repo_url.name == "flaky" and calls["flaky"] < 3:
+            raise requests.ConnectionError("reset")
+        return make_repo(repo_url)
+
+    fetcher.get_url_data = flaky_get_url_data
+    repos = {repo.name: repo for repo in fetcher.fetch_all(["https://github.com/o/flaky", "https://github.com/o/missing"])}
+
+    assert calls == {"flaky": 3, "missing": 1}
+    assert repos["flaky"].fetch_error is None
+    assert repos["missing"].fetch_error.startswith("HTTPError")
+    assert repos["missing"].fetched_at is not None
+
+
+def test_permanent_failures_keep_their_previous_data(make_response, make_repo):
+    previous_data = {
+        "missing": make_repo("https://github.com/o/missing", languages={"Go": 100.0}, contributor_count=3).to_dict(),
+        "forked": make_repo("https://github.com/other/forked", languages={"Go": 100.0}).to_dict(),
+    }
+    fetcher = RepositoryFetcher(scmType="github", headers={}, collect_commit_stats=False, previous_data=previous_data)
+
+    def get_url_data(repo_url):
+        raise requests.HTTPError("404 error", response=make_response(404))
+
+    fetcher.get_url_data = get_url_data
+    urls = ["https://github.com/o/missing", "https://github.com/o/forked", "https://github.com/o/new"]
+    repos = {repo.name: repo for repo in fetcher.fetch_all(urls)}
+
+    assert repos["missing"].languages == {"Go": 100.0}
+    assert repos["missing"].contributor_count == 3
+    assert repos["missing"].fetch_error.startswith("HTTPError")
+    # Another owner's repo with the same name is not carried over.
+    assert repos["forked"].languages == {} and repos["forked"].public_git_url == "https://github.com/o/forked.git"
+    assert repos["new"].languages == {} and repos["new"].fetch_error
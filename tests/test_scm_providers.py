@@ -0,0 +1,46 @@
+import pytest
+from utils.scm_providers import BitbucketProvider, GithubProvider, GitlabProvider, ProviderRegistry
+from utils.repo_urls import scm_for_host
+
+
+@pytest.fixture
+def registry():
+    registry = ProviderRegistry()
+    yield registry
+    registry.close()
+
+
+def test_providers_are_chosen_by_host(registry, monkeypatch):
+    monkeypatch.setenv("GITLAB_HOSTS", "gitlab.example.com")
+    scm_for_host.cache_clear()
+    try:
+        assert isinstance(registry.for_host("github.com"), GithubProvider)
+        assert isinstance(registry.for_host("GitLab.com"), GitlabProvider)
+        assert isinstance(registry.for_host("gitlab.example.com"), GitlabProvider)
+        assert isinstance(registry.for_host("bitbucket.org"), BitbucketProvider)
+        assert registry.for_host("github.com") is registry.for_host("GITHUB.COM")
+    finally:
+        scm_for_host.cache_clear()
+
+
+def test_github_enterprise_uses_the_instance_api(registry):
+    assert registry.for_host("github.com").base_url == "https://api.github.com"
+    assert registry.for_host("ghe.example.com").base_url == "https://ghe.example.com/api/v3"
+
+
+def test_self_hosted_bitbucket_is_not_sent_to_bitbucket_cloud():
+    provider = BitbucketProvider("bitbucket.example.com")
+    try:
+        with pytest.raises(ValueError, match="not supported"):
+            provider.get_language_percentages("team", "repo")
+    finally:
+        provider.close()
+
+
+def test_closed_registry_recreates_providers(registry):
+    provider = registry.for_host("github.com")
+    registry.close()
+    assert registry.providers() == []
+    with pytest.raises(RuntimeError):
+        provider.executor.submit(print)
+    assert registry.for_host("github.com") is not provider
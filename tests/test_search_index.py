@@ -0,0 +1,56 @@
+from utils.search_index import TrigramIndex, repo_search_fields, trigrams
+
+
+def _index(repos):
+    index = TrigramIndex()
+    for _ in index.add_repos(repos.items(), batch_size=2):
+        pass
+    return index
+
+
+REPOS = {
+    "requests": {"languages": {"Python": 100.0}, "public_url": "https://github.com/psf/requests"},
+    "react": {"languages": {"JavaScript": 90.0, "HTML": 10.0}, "public_url": "https://github.com/facebook/react"},
+    "tokio": {"languages": {"Rust": 100.0}, "public_url": "https://github.com/tokio-rs/tokio"},
+}
+
+
+def test_trigrams_pad_words_and_ignore_case():
+    assert trigrams("Go") == {"  g", " go", "go "}
+    assert trigrams("C# and C++") >= {" c#", " c+", "c++"}
+    assert trigrams("!!") == set()
+
+
+def test_exact_name_ranks_first_and_typos_still_match():
+    index = _index(REPOS)
+    assert index.search("react")[0][0] == "react"
+    assert index.search("reqests")[0][0] == "requests"
+    assert [key for key, _ in index.search("rust")] == ["tokio"]
+    assert index.search("zzzz") == []
+    assert index.search("") == []
+
+
+def test_name_weighs_more_than_url():
+    index = TrigramIndex()
+    index.add("tokio", repo_search_fields("tokio", {"public_url": "https://github.com/x/tokio"}))
+    index.add("other", repo_search_fields("other", {"public_url": "https://github.com/tokio/other"}))
+    scores = dict(index.search("tokio", min_score=0))
+    assert scores["tokio"] > scores["other"]
+
+
+def test_replace_and_remove_keep_postings_clean():
+    index = _index(REPOS)
+    index.add("react", repo_search_fields("react", {"languages": {"TypeScript": 100.0}}))
+    assert "react" not in dict(index.search("javascript"))
+    assert "react" in dict(index.search("typescript"))
+
+    index.remove("react")
+    index.remove("never-added")
+    assert "react" not in index
+    assert len(index) == 2
+    assert all("react" not in posting for posting in index._postings.values())
+
+
+def test_add_repos_reports_progress_per_batch():
+    progress = list(TrigramIndex().add_repos(REPOS.items(), batch_size=2))
+    assert progress == [2, 3]
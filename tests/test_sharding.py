@@ -0,0 +1,114 @@
+import json
+import os
+import pytest
+from utils.repo_urls import parse_repo_url
+from utils.sharding import (checkpoint_path, generate_shard, iter_shard_urls, merge_shards, parse_shard_spec,
+                            read_checkpoint, shard_for, shard_path)
+from utils.utils import load_json_from_file
+
+URLS = [f"https://github.com/owner{i % 3}/repo{i}" for i in range(20)] + ["https://github.com/a/utils", "https://github.com/b/utils"]
+
+
+class FakeFetcher:
+    """Returns a Repo for every URL, raising KeyboardInterrupt after fail_after repos to simulate a crash."""
+
+    def __init__(self, make_repo, fail_after=None):
+        self.make_repo = make_repo
+        self.fail_after = fail_after
+        self.fetched = []
+
+    def fetch_with_urls(self, urls):
+        for repo_url in urls:
+            if self.fail_after is not None and len(self.fetched) >= self.fail_after:
+                raise KeyboardInterrupt
+            self.fetched.append(repo_url.key)
+            yield repo_url, self.make_repo(repo_url)
+
+
+@pytest.fixture
+def repo_list(tmp_path, monkeypatch):
+    path = tmp_path / "repos.txt"
+    path.write_text("\n".join(URLS))
+    monkeypatch.setenv("GIT_REPOS_LIST_PATH", str(path))
+    monkeypatch.setenv("SHARD_CHECKPOINT_EVERY", "1")
+    monkeypatch.delenv("SNAPSHOT_DIR", raising=False)
+    monkeypatch.delenv("METRICS_OUTPUT_DIR", raising=False)
+    return path
+
+
+def test_parse_shard_spec():
+    assert parse_shard_spec("2/3") == (2, 3)
+    for spec in ("3/3", "-1/3", "1/0", "a/b", "1"):
+        with pytest.raises(ValueError):
+            parse_shard_spec(spec)
+
+
+def test_partition_is_stable_disjoint_and_complete():
+    repo_urls = [parse_repo_url(url) for url in URLS]
+    shards = [list(iter_shard_urls(repo_urls, index, 4)) for index in range(4)]
+    assert sorted(url for shard in shards for url in shard) == sorted(repo_urls)
+    # Case, .git and trailing slashes don't move a repo to another shard.
+    assert shard_for(parse_repo_url("https://GitHub.com/A/Utils.git/"), 4) == shard_for(parse_repo_url("https://github.com/a/utils"), 4)
+
+
+def test_interrupted_shard_resumes_by_key(tmp_path, repo_list, make_repo):
+    shard_dir = str(tmp_path / "shards")
+    with pytest.raises(KeyboardInterrupt):
+        generate_shard(0, 1, shard_dir=shard_dir, fetcher=FakeFetcher(make_repo, fail_after=21))
+    log_path = checkpoint_path(shard_dir, 0, 1)
+    assert len(read_checkpoint(log_path)) == 21
+    assert not os.path.exists(shard_path(shard_dir, 0, 1))
+
+    # A write cut short by the crash is ignored rather than corrupting the next line.
+    with open(log_path, "a", encoding="utf-8") as log:
+        log.write('{"key": ["github.com", "b", "ut')
+
+    fetcher = FakeFetcher(make_repo)
+    path = generate_shard(0, 1, shard_dir=shard_dir, fetcher=fetcher)
+    assert fetcher.fetched == [("github.com", "b", "utils")]
+    assert not os.path.exists(log_path)
+    assert "repo19" in load_json_from_file(path)["repos"]
+
+
+def test_finished_shard_is_refreshed_from_scratch(tmp_path, repo_list, make_repo):
+    shard_dir = str(tmp_path / "shards")
+    generate_shard(0, 2, shard_dir=shard_dir, fetcher=FakeFetcher(make_repo))
+    fetcher = FakeFetcher(make_repo)
+    generate_shard(0, 2, shard_dir=shard_dir, fetcher=fetcher)
+    assert len(fetcher.fetched) == len(list(iter_shard_urls(map(parse_repo_url, URLS), 0, 2)))
+
+
+def test_merge_prefers_successful_then_newer_fetches(tmp_path):
+    shard_dir = tmp_path / "shards"
+    shard_dir.mkdir()
+    old = {"languages": {"Go": 100.0}, "fetched_at": "2024-01-01T00:00:00+00:00"}
+    new = {"languages": {"Rust": 100.0}, "fetched_at": "2024-02-01T00:00:00+00:00"}
+    failed = {"languages": {}, "fetched_at": "2024-03-01T00:00:00+00:00", "fetch_error": "Timeout: slow"}
+    (shard_dir / "shard-0-of-2.json").write_text(json.dumps({"repos": {"x": new, "y": old}}))
+    (shard_dir / "shard-1-of-2.json").write_text(json.dumps({"repos": {"x": old, "y": failed}}))
+    (shard_dir / "shard-0-of-3.jsonl").write_text(json.dumps({"key": ["github.com", "o", "z"], "name": "z", "repo": old}) + "\n")
+
+    merged = merge_shards(str(shard_dir), output_path=str(tmp_path / "data.json"))
+
+    assert merged == {"x": new, "y": old, "z": old}
+    assert load_json_from_file(str(tmp_path / "data.json")) == merged
+
+
+def test_merge_without_shards_fails(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        merge_shards(str(tmp_path), output_path=str(tmp_path / "data.json"))
+
+
+def test_merge_keeps_the_previous_output_for_failed_repos(tmp_path):
+    shard_dir = tmp_path / "shards"
+    shard_dir.mkdir()
+    output_path = tmp_path / "data.json"
+    good = {"public_git_url": "https://github.com/o/x.git", "name": "x", "languages": {"Go": 100.0}, "fetched_at": "2024-01-01T00:00:00+00:00"}
+    failed = {"public_git_url": "https://github.com/o/x.git", "name": "x", "languages": {}, "fetched_at": "2024-03-01T00:00:00+00:00",
+              "fetch_error": "Timeout: slow"}
+    output_path.write_text(json.dumps({"x": good}))
+    (shard_dir / "shard-0-of-1.json").write_text(json.dumps({"repos": {"x": failed}}))
+
+    merged = merge_shards(str(shard_dir), output_path=str(output_path))
+
+    assert merged["x"] == {**good, "fetched_at": failed["fetched_at"], "fetch_error": "Timeout: slow"}
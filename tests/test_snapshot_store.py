@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+import pytest
+from utils.snapshot_store import SnapshotStore
+
+
+def _at(day):
+    return datetime(2024, 1, day, tzinfo=timezone.utc)
+
+
+def _repo(languages, last_commit_date="2024-01-01", fetched_at="2024-01-01T00:00:00+00:00"):
+    return {"languages": languages, "last_commit_date": last_commit_date, "fetched_at": fetched_at}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path), keyframe_interval=3)
+
+
+def test_deltas_hold_only_changed_and_removed_repos(store):
+    store.append({"a": _repo({"Python": 100.0}), "b": _repo({"Go": 100.0})}, taken_at=_at(1))
+    entry = store.append({"a": _repo({"Python": 90.0, "HTML": 10.0}), "c": _repo({"Rust": 100.0})}, taken_at=_at(2))
+
+    assert not entry["keyframe"]
+    assert (entry["changed"], entry["removed"]) == (2, 1)
+    assert set(store.state_at()) == {"a", "c"}
+    assert set(store.state_at(_at(1))) == {"a", "b"}
+
+
+def test_fetched_at_alone_is_not_a_change(store):
+    store.append({"a": _repo({"Python": 100.0})}, taken_at=_at(1))
+    entry = store.append({"a": _repo({"Python": 100.0}, fetched_at="2024-01-02T00:00:00+00:00")}, taken_at=_at(2))
+
+    assert entry["changed"] == 0
+    assert "fetched_at" not in store.state_at()["a"]
+
+
+def test_carried_forward_failure_is_not_a_change(store):
+    store.append({"a": _repo({"Python": 100.0})}, taken_at=_at(1))
+    entry = store.append({"a": {**_repo({"Python": 100.0}), "fetch_error": "Timeout: slow"}}, taken_at=_at(2))
+
+    assert entry["changed"] == 0
+
+
+def test_keyframes_are_written_every_interval(store):
+    for day in range(1, 6):
+        store.append({"a": _repo({"Python": float(day)})}, taken_at=_at(day))
+    assert [entry["keyframe"] for entry in store.index] == [True, False, False, True, False]
+    # Reopening reads the index back and still reconstructs every state.
+    reopened = SnapshotStore(store.index_path.rsplit("/", 1)[0], keyframe_interval=3)
+    assert reopened.state_at(_at(2))["a"]["languages"] == {"Python": 2.0}
+    assert reopened.state_at()["a"]["languages"] == {"Python": 5.0}
+
+
+def test_append_changes_needs_a_first_full_snapshot(store):
+    with pytest.raises(ValueError):
+        store.append_changes({"b": _repo({"Go": 100.0})})
+    assert store.index == []
+
+
+def test_append_changes_updates_single_repos(store):
+    store.append({"a": _repo({"Python": 100.0}), "b": _repo({"Go": 100.0})}, taken_at=_at(1))
+    store.append_changes({"b": _repo({"Go": 50.0, "C": 50.0})}, removed=["a"], taken_at=_at(2))
+    assert store.state_at() == {"b": {"languages": {"Go": 50.0, "C": 50.0}, "last_commit_date": "2024-01-01"}}
+
+
+def test_language_history_and_stale_repos(store):
+    store.append({"a": _repo({"Python": 100.0}, last_commit_date="2023-12-10")}, taken_at=_at(1))
+    store.append({"a": _repo({"Python": 80.0, "C": 20.0}, last_commit_date="2023-12-10")}, taken_at=_at(20))
+
+    history = store.language_share_history("a", days=30, now=_at(21))
+    assert [languages for _, languages in history] == [{"Python": 100.0}, {"Python": 80.0, "C": 20.0}]
+    assert store.repos_went_stale(_at(1), stale_after_days=30) == ["a"]
+    assert store.repos_went_stale(_at(1), stale_after_days=60) == []
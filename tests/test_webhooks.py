@@ -0,0 +1,128 @@
+import json
+import pytest
+import requests
+from utils.snapshot_store import SnapshotStore
+from utils.utils import load_json_from_file, write_json_to_file
+from utils.webhooks import (REMOVE, UPDATE, DeliveryDeduplicator, RepoUpdateQueue, WebhookReceiver, replay_events,
+                            repo_changes_for_event, sign_payload, verify_signature)
+
+SECRET = "s3cret"
+
+
+def _push(name="repo", ref="refs/heads/main"):
+    return {"ref": ref, "repository": {"name": name, "html_url": f"https://github.com/o/{name}", "default_branch": "main"}}
+
+
+def test_verify_signature():
+    body = b'{"a": 1}'
+    assert verify_signature(SECRET, body, sign_payload(SECRET, body))
+    assert not verify_signature(SECRET, body, sign_payload("other", body))
+    assert not verify_signature(SECRET, body, None)
+    assert not verify_signature(SECRET, body, "sha1=abc")
+    assert not verify_signature(SECRET, body, "sha256=éé")
+
+
+def test_repo_changes_for_event():
+    assert repo_changes_for_event("push", _push()) == [(UPDATE, "repo", "https://github.com/o/repo")]
+    assert repo_changes_for_event("push", _push(ref="refs/heads/feature")) == []
+    assert repo_changes_for_event("repository", {"action": "deleted", **_push()}) == [(REMOVE, "repo", "https://github.com/o/repo")]
+    renamed = {"action": "renamed", "changes": {"repository": {"name": {"from": "Old"}}}, **_push(name="New")}
+    assert repo_changes_for_event("repository", renamed) == [(REMOVE, "old", "https://github.com/o/New"), (UPDATE, "new", "https://github.com/o/New")]
+    assert repo_changes_for_event("star", _push()) == []
+    assert repo_changes_for_event("push", {"ref": "refs/heads/main"}) == []
+
+
+def test_deduplicator_forgets_the_oldest_ids():
+    deduplicator = DeliveryDeduplicator(max_size=2)
+    assert [deduplicator.is_duplicate(delivery) for delivery in ("a", "b", "a", "c", "b", None, None)] == \
+           [False, False, True, False, False, False, False]
+
+
+class FakeFetcher:
+    max_retries = 2
+
+    def __init__(self, make_repo, failures=0):
+        self.make_repo = make_repo
+        self.failures = failures
+        self.calls = []
+
+    def get_url_data(self, url):
+        self.calls.append(url)
+        if len(self.calls) <= self.failures:
+            raise requests.ConnectionError("reset")
+        return self.make_repo(url)
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = str(tmp_path / "data.json")
+    write_json_to_file(file_path=path, json_obj={"old": {"languages": {}}, "repo": {"languages": {}}})
+    return path
+
+
+def test_receiver_queues_coalesced_updates(data_path, make_repo):
+    fetcher = FakeFetcher(make_repo)
+    queue = RepoUpdateQueue(fetcher, data_path, debounce_seconds=60)
+    receiver = WebhookReceiver(SECRET, queue)
+    body = json.dumps(_push()).encode("utf-8")
+
+    assert receiver.handle("push", "d1", sign_payload(SECRET, body), body)[0] == 202
+    assert receiver.handle("push", "d1", sign_payload(SECRET, body), body)[0] == 200
+    assert receiver.handle("push", "d2", sign_payload(SECRET, body), body)[0] == 202
+    assert receiver.handle("push", "d3", "sha256=é", body)[0] == 401
+    assert receiver.handle("push", "d4", sign_payload(SECRET, b"nope"), b"nope")[0] == 400
+    queue.close()
+
+    assert fetcher.calls == ["https://github.com/o/repo"]
+    assert load_json_from_file(data_path)["repo"]["languages"] == {"Python": 100.0}
+
+
+def test_removals_are_applied(data_path, make_repo):
+    queue = RepoUpdateQueue(FakeFetcher(make_repo), data_path, debounce_seconds=60)
+    queue.submit(REMOVE, "old", "https://github.com/o/old")
+    queue.close()
+    assert set(load_json_from_file(data_path)) == {"repo"}
+
+
+def test_close_drains_retries(data_path, monkeypatch, make_repo):
+    monkeypatch.setattr("utils.webhooks.backoff_delay", lambda attempt: 0.01)
+    fetcher = FakeFetcher(make_repo, failures=2)
+    queue = RepoUpdateQueue(fetcher, data_path, debounce_seconds=60)
+    queue.submit(UPDATE, "repo", "https://github.com/o/repo")
+    queue.close()
+
+    assert len(fetcher.calls) == 3
+    assert load_json_from_file(data_path)["repo"]["languages"] == {"Python": 100.0}
+
+
+def test_secrets_are_required(tmp_path, data_path, make_repo):
+    queue = RepoUpdateQueue(FakeFetcher(make_repo), data_path)
+    with pytest.raises(ValueError):
+        WebhookReceiver(None, queue)
+    queue.close()
+    with pytest.raises(ValueError):
+        replay_events(str(tmp_path / "events.jsonl"), "http://127.0.0.1:1/webhook", None)
+
+
+def test_first_snapshot_holds_the_whole_data_file(tmp_path, data_path, make_repo):
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    queue = RepoUpdateQueue(FakeFetcher(make_repo), data_path, snapshot_store=store, debounce_seconds=60)
+    queue.submit(UPDATE, "repo", "https://github.com/o/repo")
+    queue.flush()
+    queue.submit(REMOVE, "old", "https://github.com/o/old")
+    queue.close()
+
+    assert [entry["keyframe"] for entry in store.index] == [True, False]
+    assert set(store._read_payload(store.index[0])["repos"]) == {"old", "repo"}
+    assert set(store.state_at()) == {"repo"}
+
+
+def test_updates_keep_the_stored_commit_stats(data_path, make_repo):
+    write_json_to_file(file_path=data_path, json_obj={"repo": {"languages": {}, "weekly_commit_activity": [1] * 52, "contributor_count": 4}})
+    queue = RepoUpdateQueue(FakeFetcher(make_repo), data_path, debounce_seconds=60)
+    queue.submit(UPDATE, "repo", "https://github.com/o/repo")
+    queue.close()
+
+    repo = load_json_from_file(data_path)["repo"]
+    assert repo["languages"] == {"Python": 100.0}
+    assert (repo["weekly_commit_activity"], repo["contributor_count"]) == ([1] * 52, 4)